@@ -6,21 +6,32 @@ from dotenv import load_dotenv
 
 # Import necessary modules from LiveKit for building voice agents
 from livekit import agents
-from livekit.agents import AgentSession, Agent, RoomInputOptions, RoomOutputOptions, WorkerOptions, cli, function_tool, RunContext
+from livekit.agents import AgentSession, Agent, ChatContext, ChatMessage, CloseReason, JobProcess, RoomInputOptions, RoomOutputOptions, WorkerOptions, cli, function_tool, RunContext
+from livekit.agents.worker import ServerEnvOption
 
-# Import additional plugins (Google LLM + noise cancellation)
-from livekit.plugins import cartesia, deepgram, google, noise_cancellation, tavus
+# Speech, language, voice and avatar plugins. They register themselves on import,
+# which must happen on the main thread, so they stay at module level; only the
+# model and client construction is deferred to prewarm and the avatar path.
+from livekit.plugins import deepgram, google, noise_cancellation, silero, tavus
 
 # Import prompt instructions and templates
-from prompts import AGENT_INSTRUCTION, SESSION_INSTRUCTION, LOOKUP_RESERVATION_MESSAGE
+from prompts import AGENT_INSTRUCTION, RESUME_MESSAGE, SESSION_INSTRUCTION, estimate_tokens, set_turn_context, turn_context
 
 # Import custom modules for database and knowledge base access
-from db_driver import DatabaseDriver
-from kb import get_kb_answer
+from db_driver import BookingConflictError, DatabaseDriver, SlotUnavailableError
+from kb import get_kb_answer, load_kb
+from kb_executor import KB_QUEUE, aget_kb_answer, set_torch_threads
+from kb_watcher import KBWatcher
+from hours import get_schedule
+from parsing import parse_date, parse_time
+from telemetry import LoopLagMonitor, TurnTracer, flush_traces, init_multiprocess, init_tracing, start_metrics_server
+from worker_load import DRAIN_TIMEOUT, LOAD_THRESHOLD, StatsPublisher, admit_job, worker_load
+from turns import INTERRUPTION_OPTIONS, TurnMonitor
+from session_store import make_session_store, make_snapshot
+import worker_state
 
 # Import required standard libraries
-import enum, os, logging, re, json
-import dateparser
+import asyncio, enum, math, os, logging, json
 
 # Load environment variables
 load_dotenv()
@@ -30,9 +41,23 @@ logger = logging.getLogger("user-data")
 logger.setLevel(logging.ERROR)
 logging.getLogger("websockets").setLevel(logging.ERROR)
 
-# Instantiate database driver
+# Seconds to wait for the Tavus avatar before starting the call voice-only
+AVATAR_START_TIMEOUT = float(os.getenv("AVATAR_START_TIMEOUT", "8"))
+
+# Seconds a job process may spend in prewarm (plugins, KB model, Silero) before
+# LiveKit kills and respawns it; its own default of 10s is too short for a cold model cache
+PREWARM_TIMEOUT = float(os.getenv("PREWARM_TIMEOUT", "60"))
+
+# Seconds a job waits for the caller to join; longer than the warm pool keeps an
+# unused room, so only rooms the pool lost track of hit it
+CALLER_WAIT_TIMEOUT = float(os.getenv("CALLER_WAIT_TIMEOUT", "900"))
+
+# Instantiate database driver; the MongoDB client is only created on first use
 DB = DatabaseDriver()
 
+# Per-room snapshots that let a reconnecting caller pick up where they left off
+SESSION_STORE = make_session_store(db=DB)
+
 # Enum class to represent fields of a reservation
 class ReservationDetails(enum.Enum):
     NAME = "name"
@@ -43,9 +68,13 @@ class ReservationDetails(enum.Enum):
 
 # Custom Agent for handling restaurant reservations
 class RestaurantAgent(Agent):
-    def __init__(self) -> None:
+    def __init__(self, tracer: TurnTracer | None = None, on_state_change=None) -> None:
         # Initialize the base Agent with general instruction
         super().__init__(instructions=AGENT_INSTRUCTION)
+        # Per-turn latency tracing for tool calls
+        self.tracer = tracer or TurnTracer()
+        # Awaited after a tool changes the reservation, e.g. to snapshot the session
+        self.on_state_change = on_state_change
         # Internal dictionary to store reservation data
         self._reservation: dict[ReservationDetails, str] = {
             ReservationDetails.NAME: "",
@@ -54,6 +83,45 @@ class RestaurantAgent(Agent):
             ReservationDetails.TIME: "",
             ReservationDetails.GUESTS: ""
         }
+        # Per-turn context last written into the chat context
+        self._turn_context = None
+
+    # Reservation fields as plain strings, for session snapshots
+    def reservation_fields(self) -> dict[str, str]:
+        return {k.value: v for k, v in self._reservation.items()}
+
+    # Restore reservation fields saved by reservation_fields()
+    def restore_reservation(self, fields: dict[str, str]) -> None:
+        for key in ReservationDetails:
+            self._reservation[key] = str(fields.get(key.value, ""))
+
+    # Pick up a session snapshot: its reservation fields and the condensed conversation
+    async def resume(self, snapshot: dict) -> None:
+        self.restore_reservation(snapshot["reservation"])
+        chat_ctx = self.chat_ctx.copy()
+        for message in snapshot["history"]:
+            chat_ctx.add_message(role=message["role"], content=message["text"])
+        await self.update_chat_ctx(chat_ctx)
+
+    # Called by the session before it replies to each user turn. The per-turn context
+    # (today's date, the reservation on file) lives in the agent's chat context as one
+    # system message and is only rewritten when it changes, so the prompt stays the same
+    # between turns and a preemptive generation, which starts from the agent's chat
+    # context, still matches the finished turn.
+    async def on_user_turn_completed(self, turn_ctx: ChatContext, new_message: ChatMessage) -> None:
+        context = turn_context(self.get_reservation_str() if self.has_reservation() else None)
+        self.tracer.add_next_turn_tokens("dynamic_prompt_tokens_est", estimate_tokens(context))
+        if context == self._turn_context:
+            return
+        self._turn_context = context
+        chat_ctx = self.chat_ctx.copy()
+        set_turn_context(chat_ctx, context)
+        set_turn_context(turn_ctx, context)
+        await self.update_chat_ctx(chat_ctx)
+
+    async def _state_changed(self) -> None:
+        if self.on_state_change is not None:
+            await self.on_state_change()
 
     # Check if a reservation exists (based on phone number)
     def has_reservation(self):
@@ -72,7 +140,8 @@ class RestaurantAgent(Agent):
     # Tool to look up a reservation by phone number
     @function_tool()
     async def lookup_reservation(self, context: RunContext, phone: str) -> str:
-        result = DB.get_reservation_by_phone(phone)
+        with self.tracer.stage("lookup_reservation.db"):
+            result = await DB.get_reservation_by_phone(phone)
         if not result:
             return "Reservation not found"
         # Populate internal reservation state
@@ -83,71 +152,70 @@ class RestaurantAgent(Agent):
             ReservationDetails.TIME: result["time"],
             ReservationDetails.GUESTS: str(result["guests"]),
         }
+        await self._state_changed()
         return f"Found reservation:\n{self.get_reservation_str()}"
 
     # Tool to check for table availability
     @function_tool()
     async def check_availability(self, context: RunContext, date: str, time: str) -> str:
         # Validate and parse date and time from user input
-        parsed_date = dateparser.parse(date)
+        with self.tracer.stage("check_availability.parse"):
+            parsed_date = parse_date(date)
+            requested_time = parse_time(time)
         if not parsed_date:
             return "I'm sorry, I could not understand the date you provided. Please try again."
         
-        requested_time_dt = dateparser.parse(time)
-        if not requested_time_dt:
+        if not requested_time:
             return "I'm sorry, I could not understand the time you provided. Please try again."
 
         day_of_week = parsed_date.strftime('%A')
+        weekday = parsed_date.weekday()
 
-        # Get restaurant hours from the knowledge base
-        timings_str = get_kb_answer(f"What are the restaurant's hours on {day_of_week}s?")
-        
-        # Define the mapping from specific days to the day ranges in the KB
-        day_map = {
-            "Monday": "Monday to Thursday",
-            "Tuesday": "Monday to Thursday",
-            "Wednesday": "Monday to Thursday",
-            "Thursday": "Monday to Thursday",
-            "Friday": "Friday – Saturday",
-            "Saturday": "Friday – Saturday",
-            "Sunday": "Sunday",
-        }
-        day_key = day_map.get(day_of_week)
-
-        day_hours_str = None
-        if day_key:
-            for line in timings_str.split('\n'):
-                if day_key in line:
-                    day_hours_str = line
-                    break
-        
-        if day_hours_str:
-            # Extract opening and closing times using regex
-            time_matches = re.findall(r'(\d{1,2}:\d{2}\s*[AP]M)', day_hours_str)
-            if len(time_matches) == 2:
-                open_time_str, close_time_str = time_matches
-                open_time_dt = dateparser.parse(open_time_str)
-                close_time_dt = dateparser.parse(close_time_str)
-
-                # Check if the requested time is within the opening hours
-                if not (open_time_dt <= requested_time_dt <= close_time_dt):
-                    return f"I'm sorry, the restaurant is not open at {time} on {day_of_week}. The hours are from {open_time_str} to {close_time_str}."
-                else:
-                    return f"The restaurant is open at {time} on {day_of_week}, {date}. You can proceed with the booking."
-            else:
-                return "I can proceed with the booking, but I could not verify the opening hours."
-        else:
+        # Look up the precompiled opening hours for that weekday
+        schedule = get_schedule()
+        if not schedule.knows(weekday):
             return f"I can proceed with the booking for {day_of_week}, {date}, but I could not find specific hours for that day."
+        if schedule.is_closed_all_day(weekday):
+            return f"I'm sorry, the restaurant is closed on {day_of_week}s."
+
+        # Check if the requested time is within the opening hours
+        requested_minute = requested_time[0] * 60 + requested_time[1]
+        if not schedule.is_open(weekday, requested_minute):
+            return f"I'm sorry, the restaurant is not open at {time} on {day_of_week}. The hours are from {schedule.describe(weekday)}."
+
+        # Opening hours are fine; make sure the slot still has seats
+        with self.tracer.stage("check_availability.db"):
+            remaining = await DB.get_slot_availability(parsed_date.strftime("%Y-%m-%d"), time)
+        if remaining == 0:
+            return f"I'm sorry, we are fully booked at {time} on {day_of_week}, {date}. Please choose a different time."
+        return f"The restaurant is open at {time} on {day_of_week}, {date}. You can proceed with the booking."
 
     # Tool to create a new reservation and update internal state
     @function_tool()
     async def create_reservation(self, context: RunContext, name: str, phone: str, date: str, time: str, guests: int) -> str:
         
-        parsed_date = dateparser.parse(date)
+        with self.tracer.stage("create_reservation.parse"):
+            parsed_date = parse_date(date)
+            requested_time = parse_time(time)
         if parsed_date:
             date = parsed_date.strftime("%Y-%m-%d")
+        if not requested_time:
+            return "I'm sorry, I could not understand the time you provided. Please try again."
 
-        result = DB.create_reservation(name, phone, date, time, guests)
+        try:
+            with self.tracer.stage("create_reservation.db"):
+                result = await DB.create_reservation(name, phone, date, time, guests)
+        except SlotUnavailableError:
+            return f"I'm sorry, we are fully booked for {guests} guests at {time} on {date}. Please choose a different time."
+        except BookingConflictError as e:
+            existing = e.existing
+            return (
+                f"This phone number already has a reservation on {existing['date']} at {existing['time']} "
+                f"for {existing['guests']} guests under the name {existing['name']}. "
+                "Ask the caller whether they meant that booking; a different booking in the same slot needs a different phone number."
+            )
+        if not result:
+            return "I'm sorry, I could not save the reservation right now. Please try again."
         self._reservation = {
             ReservationDetails.NAME: result["name"],
             ReservationDetails.PHONE: result["phone"],
@@ -155,6 +223,7 @@ class RestaurantAgent(Agent):
             ReservationDetails.TIME: result["time"],
             ReservationDetails.GUESTS: str(result["guests"])
         }
+        await self._state_changed()
         return f"Reservation created:\n{self.get_reservation_str()}"
 
     # Tool to get current reservation details if available
@@ -168,18 +237,84 @@ class RestaurantAgent(Agent):
     @function_tool()
     async def answer_restaurant_question(self, context: RunContext, question: str) -> str:
         try:
-            return get_kb_answer(question)
+            with self.tracer.stage("answer_restaurant_question.kb"):
+                return await aget_kb_answer(question)
         except Exception as e:
             logger.error("Error getting KB answer: %s", e)
             return "Sorry, I had trouble finding an answer to that."
 
-from livekit.rtc.participant import PublishTranscriptionError
 
+# Load and warm everything a call needs once per job process, before a job is assigned
+def prewarm(proc: JobProcess):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    # Export this process's turn spans, and LiveKit's own, to the configured OTLP collector
+    init_tracing()
+
+    # Speech, language and voice plugins shared by every session in this process
+    proc.userdata["stt"] = deepgram.STT()
+    proc.userdata["llm"] = google.LLM()
+    proc.userdata["tts"] = deepgram.TTS()
+
+    # Voice activity detection and noise cancellation models
+    proc.userdata["vad"] = silero.VAD.load()
+    proc.userdata["noise_cancellation"] = noise_cancellation.BVC()
+
+    # Map the KB index and run a dummy encode so the first question is not a cold start
+    set_torch_threads()
+    load_kb()
+    get_kb_answer("What are your opening hours?")
+
+    # Pick up edits to the knowledge base without restarting the worker
+    proc.userdata["kb_watcher"] = KBWatcher(submit=KB_QUEUE.submit)
+    proc.userdata["kb_watcher"].start()
 
-# Entry point for the agent application
-stt = deepgram.STT()
-llm = google.LLM()
-tts = deepgram.TTS()
+    # Parse the opening hours table used by check_availability
+    get_schedule()
+
+    # Establish the MongoDB connection pool; indexes are ensured once by the worker
+    if not DB.ping():
+        logging.warning("MongoDB ping failed during prewarm, connections will be retried on first use.")
+
+    worker_state.mark_ready()
+    logging.info("Job process prewarmed and ready.")
+
+# Hand the session's audio to a Tavus avatar before the session starts. The avatar
+# handshake runs while the speech plugins open their connections and is cut off
+# after AVATAR_START_TIMEOUT; on failure the call carries on voice-only.
+async def start_avatar(session: AgentSession, room, userdata) -> bool:
+    logging.info("Voice + Avatar call detected, attempting to initialize Tavus.")
+    tavus_api_key = os.getenv("TAVUS_API_KEY")
+    if not tavus_api_key:
+        logging.warning("TAVUS_API_KEY not set. Starting a voice-only session for the avatar call.")
+        return False
+
+    avatar = None
+    try:
+        avatar = tavus.AvatarSession(
+            api_key=tavus_api_key,
+            replica_id="r6ca16dbe104",
+            persona_id="pa5f2854bea3",
+        )
+        handshake = asyncio.create_task(avatar.start(session, room=room))
+
+        # Warm the speech connections while Tavus sets up the conversation
+        for plugin in ("stt", "llm", "tts"):
+            userdata[plugin].prewarm()
+
+        await asyncio.wait_for(handshake, AVATAR_START_TIMEOUT)
+        logging.info("Tavus AvatarSession started successfully.")
+        return True
+    except Exception as e:
+        logging.error(f"Failed to initialize Tavus, falling back to voice-only. Error: {e!r}")
+        # Drop any audio sink the avatar installed so the session publishes to the room itself
+        session.output.audio = None
+        if avatar is not None and hasattr(avatar, "aclose"):
+            try:
+                await avatar.aclose()
+            except Exception as close_error:
+                logging.warning(f"Error closing Tavus AvatarSession: {close_error!r}")
+        return False
 
 async def entrypoint(ctx: agents.JobContext):
     """
@@ -188,6 +323,13 @@ async def entrypoint(ctx: agents.JobContext):
     # Initialize logging
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+    # This process is now taken by a job; report its load to the worker until it ends
+    worker_state.mark_busy()
+    stats_publisher = StatsPublisher(LoopLagMonitor(), KB_QUEUE.depth, job_id=ctx.job.id)
+    stats_publisher.start()
+    ctx.add_shutdown_callback(stats_publisher.stop)
+    ctx.add_shutdown_callback(flush_traces)
+
     # Connect to the room
     await ctx.connect()
     logging.info(f"Agent connected to room: {ctx.room.name}")
@@ -205,98 +347,107 @@ async def entrypoint(ctx: agents.JobContext):
         logging.error("Failed to parse room metadata, defaulting to Voice Only.")
 
     # Initialize the agent session
-    session = AgentSession(stt=stt, llm=llm, tts=tts)
-    agent = RestaurantAgent()
-
-    # Determine how to start the session based on the call type
+    userdata = ctx.proc.userdata
+    session = AgentSession(
+        stt=userdata["stt"],
+        llm=userdata["llm"],
+        tts=userdata["tts"],
+        vad=userdata["vad"],
+        turn_handling={"interruption": INTERRUPTION_OPTIONS},
+    )
+    tracer = TurnTracer(room=ctx.room.name, call_type=call_type)
+    tracer.attach(session)
+
+    # The session retries through a few unrecoverable errors before it gives up and
+    # closes with CloseReason.ERROR, so an error alone does not end the call
+    def on_session_error(e):
+        logging.error(f"Unrecoverable {e.type} in session: {e.error}")
+
+    # The session replies to each committed turn itself; the monitor counts replies
+    # and the ones a newer turn cut short
+    turn_monitor = TurnMonitor(session, on_session_error, call_type=call_type)
+    turn_monitor.attach()
+
+    # Snapshot the reservation and recent conversation so a reconnect can resume;
+    # snapshots belong to the caller, so nothing is saved before one has joined
+    caller = None
+    async def save_snapshot():
+        if caller is not None:
+            await SESSION_STORE.save(ctx.room.name, caller, make_snapshot(caller, agent.reservation_fields(), agent.chat_ctx, call_type))
+
+    agent = RestaurantAgent(tracer, on_state_change=save_snapshot)
+
+    # A call that ends normally (the caller hung up, or the agent finished) needs no
+    # snapshot; one cut short by errors or a job shutdown keeps it for a reconnect.
+    # Registered before the session starts, so an error during the greeting is covered too.
+    @session.on("close")
+    def on_close(ev):
+        logging.info(f"Session closed ({ev.reason}), turns: {turn_monitor.stats()}")
+        if ev.reason in (CloseReason.ERROR, CloseReason.JOB_SHUTDOWN):
+            asyncio.create_task(save_snapshot())
+        elif caller is not None:
+            asyncio.create_task(SESSION_STORE.delete(ctx.room.name, caller))
+
+    # One session start for every call type; avatar calls publish audio through Tavus
+    avatar_ok = False
     if call_type == "Voice + Avatar":
-        logging.info("Voice + Avatar call detected, attempting to initialize Tavus.")
-        tavus_api_key = os.getenv("TAVUS_API_KEY")
-        if tavus_api_key:
-            try:
-                avatar = tavus.AvatarSession(
-                    api_key=tavus_api_key,
-                    replica_id="r6ca16dbe104",
-                    persona_id="pa5f2854bea3",
-                )
-                # Start the session with audio disabled since Tavus will handle it
-                await session.start(
-                    room=ctx.room,
-                    agent=agent,
-                    room_input_options=RoomInputOptions(
-                        noise_cancellation=noise_cancellation.BVC()
-                    ),
-                    room_output_options=RoomOutputOptions(
-                        audio_enabled=False
-                    ),
-                )
-                # Start the avatar, which takes over video and audio publishing
-                await avatar.start(session, room=ctx.room)
-                logging.info("Tavus AvatarSession started successfully.")
-            except Exception as e:
-                logging.error(f"Failed to initialize Tavus, falling back to voice-only. Error: {e}")
-                # If Tavus fails, restart the session with audio enabled
-                await session.start(
-                    room=ctx.room,
-                    agent=agent,
-                    room_input_options=RoomInputOptions(
-                        noise_cancellation=noise_cancellation.BVC()
-                    ),
-                    room_output_options=RoomOutputOptions(
-                        audio_enabled=True
-                    ),
-                )
-        else:
-            # Fallback for avatar call if Tavus API key is missing
-            logging.warning("TAVUS_API_KEY not set. Starting a voice-only session for the avatar call.")
-            await session.start(
-                room=ctx.room,
-                agent=agent,
-                room_input_options=RoomInputOptions(
-                    noise_cancellation=noise_cancellation.BVC()
-                ),
-                room_output_options=RoomOutputOptions(
-                    audio_enabled=True
-                ),
-            )
+        with tracer.stage("avatar.start"):
+            avatar_ok = await start_avatar(session, ctx.room, userdata)
     else:
-        # Standard voice call
         logging.info("Voice-only call detected, starting a regular agent session.")
-        await session.start(
-            room=ctx.room,
-            agent=agent,
-            room_input_options=RoomInputOptions(
-                noise_cancellation=noise_cancellation.BVC()
-            ),
-            room_output_options=RoomOutputOptions(
-                audio_enabled=True
-            ),
-        )
-
-    # Generate the initial greeting
-    await session.generate_reply(instructions=SESSION_INSTRUCTION)
-
-    # Define the user message handler
-    @session.on("user_message")
-    def on_user(msg):
-        import asyncio
-        asyncio.create_task(handle_user(msg))
-
-    async def handle_user(msg):
-        try:
-            if agent.has_reservation():
-                await session.generate_reply()
-            else:
-                await session.generate_reply(instructions=LOOKUP_RESERVATION_MESSAGE(msg.content))
-        except (PublishTranscriptionError, ConnectionError) as e:
-            logging.warning(f"Connection lost while generating reply: {e}")
-            await session.stop()
-        except Exception as e:
-            logging.error(f"An unexpected error occurred in handle_user: {e}", exc_info=True)
-            await session.stop()
+    await session.start(
+        room=ctx.room,
+        agent=agent,
+        room_input_options=RoomInputOptions(
+            noise_cancellation=userdata["noise_cancellation"]
+        ),
+        room_output_options=RoomOutputOptions(
+            audio_enabled=not avatar_ok
+        ),
+    )
+
+    # Rooms may be pre-created by the server's warm pool, so wait for the caller before greeting
+    try:
+        participant = await asyncio.wait_for(ctx.wait_for_participant(), CALLER_WAIT_TIMEOUT)
+    except asyncio.TimeoutError:
+        logging.warning(f"No caller joined room {ctx.room.name} within {CALLER_WAIT_TIMEOUT:.0f}s, ending the job.")
+        ctx.shutdown(reason="no caller joined")
+        return
+    caller = participant.identity
+    logging.info(f"Caller joined: {caller}")
+
+    # A caller rejoining this room resumes from their last snapshot instead of starting over
+    snapshot = await SESSION_STORE.load(ctx.room.name, caller)
+    if snapshot:
+        logging.info(f"Resuming session for {caller} in room {ctx.room.name} from snapshot.")
+        await agent.resume(snapshot)
+
+    # Generate the initial greeting; a resumed call gets a fixed line instead of an LLM turn
+    if snapshot:
+        session.say(RESUME_MESSAGE)
+    else:
+        await session.generate_reply(instructions=f"{turn_context()}\n{SESSION_INSTRUCTION}")
 
 if __name__ == "__main__":
+    # Make sure lookups are index-backed, once per worker rather than in every job process;
+    # job processes come from the forkserver, so this client is not shared with them
+    if not DB.ensure_indexes():
+        logging.warning("Could not ensure MongoDB indexes at worker start.")
+
+    # Shared directory through which job processes report readiness and load
+    state_dir = worker_state.init_worker_state()
+    # Job processes write metrics into the state directory; the worker serves them
+    init_multiprocess(state_dir)
+    start_metrics_server()
     cli.run_app(WorkerOptions(
         entrypoint_fnc=entrypoint,
+        prewarm_fnc=prewarm,
+        initialize_process_timeout=PREWARM_TIMEOUT,
+        load_fnc=worker_load,
+        # Dev workers keep LiveKit's unlimited threshold so they always take jobs
+        load_threshold=ServerEnvOption(dev_default=math.inf, prod_default=LOAD_THRESHOLD),
+        request_fnc=admit_job,
+        # Let active calls finish when the worker is asked to shut down
+        drain_timeout=DRAIN_TIMEOUT,
         agent_name="restaurant-video-agent"  # This must match the dispatch name
     ))
\ No newline at end of file
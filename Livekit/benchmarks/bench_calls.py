@@ -0,0 +1,309 @@
+# Offline end-to-end call-flow benchmark for RestaurantAgent.
+#
+# Runs N concurrent simulated calls through the agent's real entrypoint in one
+# process, with no external services:
+#   - the job context and room are local stand-ins; the caller joins at once
+#   - STT is a scripted transcript, committed as a finished user turn after a
+#     configurable recognition delay
+#   - the LLM is a script mapping each utterance to the tool calls it would make,
+#     then a reply read from the tool results
+#   - TTS sleeps in proportion to the reply length, and playout is instant
+#   - the database is the in-memory backend (DB_BACKEND=memory)
+# Everything between those stubs is the shipped code: the AgentSession's turn
+# handling and tool execution, the RestaurantAgent tools, DB, KB, parsing and
+# hours lookups. Output is JSON keyed by git commit, so runs on different commits
+# can be compared with --compare.
+#
+#   python benchmarks/bench_calls.py --calls 50 --output after.json --compare before.json
+#   python benchmarks/bench_calls.py --fake-kb     # hashing encoder instead of the model download
+
+import argparse
+import asyncio
+import contextvars
+import itertools
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+# Stand-in database; must be set before the agent module creates its driver
+os.environ.setdefault("DB_BACKEND", "memory")
+
+import numpy as np
+from livekit.agents import llm
+
+import agent as agent_module
+import kb
+import telemetry
+from fake_plugins import FakeAudioOutput, FakeJobContext, FakeLLM, FakeTTS, commit_user_turn
+
+# ---------- Scripted Calls ----------
+
+# Each turn: what the caller says, and the tool calls the LLM makes in response
+def _booking_script(caller: int) -> list:
+    phone = f"555{caller:07d}"
+    return [
+        ("Hi, I'd like to book a table", []),
+        ("Tomorrow at 7:30 PM", [("check_availability", {"date": "tomorrow", "time": "7:30 PM"})]),
+        ("Do you have gluten-free options?", [("answer_restaurant_question", {"question": "Do you have gluten-free options?"})]),
+        (f"My name is Caller {caller}, phone {phone}, four guests", [
+            ("create_reservation", {"name": f"Caller {caller}", "phone": phone, "date": "tomorrow", "time": "7:30 PM", "guests": 4}),
+        ]),
+        ("Can you read that back?", [("get_reservation_details", {})]),
+    ]
+
+# Looks up the reservation the previous (booking) caller made
+def _lookup_script(caller: int) -> list:
+    phone = f"555{caller - 1:07d}"
+    return [
+        ("I want to check my reservation", []),
+        (phone, [("lookup_reservation", {"phone": phone})]),
+        ("What are your hours on Sunday?", [("answer_restaurant_question", {"question": "What are your hours on Sunday?"})]),
+        ("Is next Friday at 10 PM open?", [("check_availability", {"date": "next Friday", "time": "10 PM"})]),
+    ]
+
+SCRIPTS = [_booking_script, _lookup_script]
+
+# Set by each booking call once its reservation exists, so the lookup call after it
+# never races ahead of the booking it looks up; filled in by run()
+BOOKED: dict[int, asyncio.Event] = {}
+
+# ---------- Fake Plugins ----------
+
+class HashingEncoder:
+    """
+    Deterministic bag-of-words encoder standing in for the sentence transformer.
+    """
+    dim = 384
+
+    def encode(self, texts, normalize_embeddings=True, **kwargs):
+        single = isinstance(texts, str)
+        vectors = np.zeros((1 if single else len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate([texts] if single else texts):
+            for word in text.lower().split():
+                vectors[row, hash(word) % self.dim] += 1.0
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+        return vectors[0] if single else vectors
+
+# Tool calls by utterance, across all scripts; filled in by run()
+TOOL_CALLS: dict[str, list] = {}
+
+_call_ids = itertools.count()
+
+class ScriptedLLM(FakeLLM):
+    """
+    Answers a caller utterance with the tool calls its script lists, and a tool
+    result with a reply quoting it. Records each tool's latency, from the LLM
+    emitting the call to the session returning its output.
+    """
+    def __init__(self, room: str, delay: float = 0.0):
+        super().__init__(respond=self._respond, delay=delay)
+        self.room = room
+        self._pending: dict[str, tuple] = {}
+
+    def _respond(self, chat_ctx):
+        # The per-turn context note is a system message after the caller's message
+        items = [
+            item for item in chat_ctx.items
+            if item.type == "function_call_output" or (item.type == "message" and item.role != "system")
+        ]
+        last = items[-1] if items else None
+        if last is not None and last.type == "function_call_output":
+            for item in items:
+                if item.type == "function_call_output" and item.call_id in self._pending:
+                    name, started = self._pending.pop(item.call_id)
+                    telemetry.record(f"tool.{name}", time.perf_counter() - started, self.room, "Voice Only")
+            return last.output[:200], []
+        if last is not None and last.role == "user":
+            calls = []
+            for name, kwargs in TOOL_CALLS.get(last.text_content, []):
+                call_id = f"call-{next(_call_ids)}"
+                self._pending[call_id] = (name, time.perf_counter())
+                calls.append(llm.FunctionToolCall(name=name, arguments=json.dumps(kwargs), call_id=call_id))
+            if calls:
+                return "", calls
+        return "Certainly, how can I help?", []
+
+# ---------- Harness ----------
+
+class SimulatedCall:
+    def __init__(self, caller: int):
+        self.caller = caller
+        self.room = f"bench-room-{caller}"
+        self.session = None
+        self.speeches = []
+
+# The call whose entrypoint is running in this task
+CURRENT_CALL: contextvars.ContextVar[SimulatedCall] = contextvars.ContextVar("CURRENT_CALL")
+
+class BenchSession(agent_module.AgentSession):
+    """
+    The entrypoint's AgentSession, registered with the call it belongs to. Once
+    started, its audio goes to FakeAudioOutput instead of the room's track.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        call = CURRENT_CALL.get()
+        call.session = self
+        self.on("speech_created", lambda ev: call.speeches.append(ev.speech_handle))
+
+    async def start(self, *args, **kwargs):
+        result = await super().start(*args, **kwargs)
+        self.output.audio = FakeAudioOutput()
+        self.output.transcription = None
+        return result
+
+# Say one utterance and wait until the reply to it, tool calls included, has played out
+async def say(call: SimulatedCall, utterance: str, args) -> None:
+    await asyncio.sleep(args.stt_delay * random.uniform(0.8, 1.2))
+    before = len(call.speeches)
+    commit_user_turn(call.session, utterance)
+    while len(call.speeches) == before:
+        await asyncio.sleep(0.002)
+    await call.speeches[-1]
+
+# What prewarm puts in proc.userdata. Each call gets its own plugins, as each job
+# process does; a session reports the metrics of every session sharing its plugins.
+def prewarmed_userdata(room: str, args) -> dict:
+    return {
+        "stt": None,
+        "llm": ScriptedLLM(room, delay=args.llm_delay),
+        "tts": FakeTTS(seconds_per_char=args.tts_seconds_per_char),
+        "vad": None,
+        "noise_cancellation": None,
+    }
+
+async def simulate_call(caller: int, args) -> None:
+    call = SimulatedCall(caller)
+    CURRENT_CALL.set(call)
+    script = SCRIPTS[caller % len(SCRIPTS)]
+    if script is _lookup_script:
+        await BOOKED[caller - 1].wait()
+
+    ctx = FakeJobContext(call.room, prewarmed_userdata(call.room, args), caller=f"caller-{caller}")
+    await agent_module.entrypoint(ctx)
+    # The greeting has been generated; let it finish before the caller speaks
+    for speech in list(call.speeches):
+        await speech
+    for utterance, _ in script(caller):
+        await say(call, utterance, args)
+    await call.session.aclose()
+    await ctx.run_shutdown()
+    if caller in BOOKED:
+        BOOKED[caller].set()
+
+def _summary(samples: list) -> dict:
+    if not samples:
+        return {}
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.mean(samples) * 1000,
+        "p50_ms": statistics.median(samples) * 1000,
+        "p99_ms": samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000,
+        "max_ms": samples[-1] * 1000,
+    }
+
+def _rss_mb() -> float:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        # ru_maxrss is in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+async def run(args) -> dict:
+    random.seed(args.seed)
+    if args.fake_kb:
+        # Keep the fake index away from the real one in kb_index/
+        kb.MODEL = HashingEncoder()
+        kb.load_kb(index_dir=tempfile.mkdtemp(prefix="bench-kb-"))
+    else:
+        kb.load_kb()
+    telemetry.LOCAL_EXPORTER.clear()
+    BOOKED.clear()
+    BOOKED.update({caller: asyncio.Event() for caller in range(0, args.calls, len(SCRIPTS))})
+    TOOL_CALLS.clear()
+    for caller in range(args.calls):
+        TOOL_CALLS.update(SCRIPTS[caller % len(SCRIPTS)](caller))
+
+    agent_module.AgentSession = BenchSession
+
+    lag = telemetry.LoopLagMonitor(interval=0.01)
+    lag.start()
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    async def bounded(caller):
+        async with semaphore:
+            await simulate_call(caller, args)
+    await asyncio.gather(*[bounded(caller) for caller in range(args.calls)])
+
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    await lag.stop()
+
+    stages = sorted({r["stage"] for r in telemetry.LOCAL_EXPORTER.records})
+    return {
+        "commit": _git_commit(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "wall_s": wall,
+        "cpu_s": cpu,
+        "cpu_utilization": cpu / wall if wall else 0.0,
+        "rss_mb": _rss_mb(),
+        "loop_lag": _summary(lag.samples),
+        "stages": {stage: _summary(telemetry.LOCAL_EXPORTER.durations(stage)) for stage in stages},
+        "db": agent_module.DB.metrics.snapshot(),
+        "kb_cache": kb.ANSWER_CACHE.stats(),
+        "reservation_cache": agent_module.DB.cache.stats(),
+    }
+
+def _print_report(result: dict, baseline: dict | None) -> None:
+    print(f"commit {result['commit']}  wall {result['wall_s']:.2f}s  cpu {result['cpu_s']:.2f}s  rss {result['rss_mb']:.0f} MB")
+    print(f"event-loop lag p50 {result['loop_lag'].get('p50_ms', 0):.2f} ms  p99 {result['loop_lag'].get('p99_ms', 0):.2f} ms  max {result['loop_lag'].get('max_ms', 0):.2f} ms")
+    for stage, stats in result["stages"].items():
+        line = f"  {stage:<36} n={stats['count']:<5} p50 {stats['p50_ms']:>8.2f} ms  p99 {stats['p99_ms']:>8.2f} ms"
+        old = (baseline or {}).get("stages", {}).get(stage)
+        if old:
+            line += f"   (p99 {stats['p99_ms'] - old['p99_ms']:+.2f} ms vs {baseline['commit']})"
+        print(line)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline RestaurantAgent call-flow benchmark")
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--stt-delay", type=float, default=0.05)
+    parser.add_argument("--llm-delay", type=float, default=0.0)
+    parser.add_argument("--tts-seconds-per-char", type=float, default=0.0)
+    parser.add_argument("--fake-kb", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON result here")
+    parser.add_argument("--compare", help="JSON result from another commit to diff against")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    _print_report(result, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# Embedding backend benchmark and parity check for KB retrieval.
+#
+# Each backend runs in its own process, like a fresh job process, which reports:
+#   - import + model load time
+#   - resident memory added by the backend
+#   - encode latency for single questions and for a micro-batch
+# The parent then compares every backend with the first one on the
+# knowledge.md chunks and a set of caller questions. It checks the cosine
+# similarity of the embeddings and whether retrieval returns the same top-k
+# chunks. It exits non-zero when parity is below --min-cosine or --min-topk.
+#
+#   python benchmarks/bench_embeddings.py --backends torch,onnx
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import numpy as np
+
+# Questions callers ask that are answered from the KB
+QUESTIONS = [
+    "What are your opening hours?", "Are you open on Monday?", "Do you have vegetarian options?",
+    "Is there parking?", "Do you take walk-ins?", "What is your dress code?", "Can I bring my own wine?",
+    "Do you have a kids menu?", "Where are you located?", "Do you offer gluten free dishes?",
+    "How late is the kitchen open on Saturday?", "Do you host private events?",
+]
+
+def _rss_mb() -> float:
+    import psutil
+    return psutil.Process().memory_info().rss / 2**20
+
+def _ms_summary(samples: list[float]) -> dict:
+    samples = sorted(samples)
+    return {
+        "p50_ms": statistics.median(samples) * 1000,
+        "p99_ms": samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000,
+    }
+
+# Child process: load one backend, time it, and save the embeddings for parity
+def measure(output: str, repeat: int) -> None:
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    import kb
+    from kb_embeddings import KB_EMBEDDING_BACKEND, load_encoder
+    encoder = load_encoder(kb.MODEL_NAME)
+    load_s = time.perf_counter() - start
+    rss_loaded = _rss_mb()
+
+    chunks = [chunk["text"] for chunk in kb._split_chunks(kb._read_kb(kb.KB_PATH))]
+    chunk_embeddings = np.asarray(encoder.encode(chunks, normalize_embeddings=True), dtype=np.float32)
+    query_embeddings = np.asarray(encoder.encode(QUESTIONS, normalize_embeddings=True), dtype=np.float32)
+    np.savez(output, chunks=chunk_embeddings, queries=query_embeddings)
+
+    single, batch = [], []
+    for _ in range(repeat):
+        for question in QUESTIONS:
+            t = time.perf_counter()
+            encoder.encode([question], normalize_embeddings=True, batch_size=1)
+            single.append(time.perf_counter() - t)
+        t = time.perf_counter()
+        encoder.encode(QUESTIONS, normalize_embeddings=True, batch_size=len(QUESTIONS))
+        batch.append(time.perf_counter() - t)
+
+    print(json.dumps({
+        "backend": KB_EMBEDDING_BACKEND,
+        "load_s": load_s,
+        "rss_backend_mb": rss_loaded - rss_before,
+        "rss_total_mb": _rss_mb(),
+        "single": _ms_summary(single),
+        f"batch_{len(QUESTIONS)}": _ms_summary(batch),
+    }))
+
+def _run_backend(backend: str, output: str, repeat: int) -> dict:
+    env = {**os.environ, "KB_EMBEDDING_BACKEND": backend}
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--measure", output, "--repeat", str(repeat)],
+        env=env, capture_output=True, text=True, cwd=BASE_DIR,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{backend} backend failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+# Cosine similarity per text and agreement of the top-k retrieved chunks per question
+def parity(reference: dict, candidate: dict, top_k: int) -> dict:
+    cosines = np.concatenate([
+        (reference["chunks"] * candidate["chunks"]).sum(axis=1),
+        (reference["queries"] * candidate["queries"]).sum(axis=1),
+    ])
+    k = min(top_k, len(reference["chunks"]))
+    ref_top = np.argsort(-(reference["queries"] @ reference["chunks"].T), axis=1)[:, :k]
+    cand_top = np.argsort(-(candidate["queries"] @ candidate["chunks"].T), axis=1)[:, :k]
+    overlap = [len(set(a) & set(b)) / k for a, b in zip(ref_top, cand_top)]
+    return {
+        "min_cosine": float(cosines.min()),
+        "mean_cosine": float(cosines.mean()),
+        "top1_agreement": float(np.mean(ref_top[:, 0] == cand_top[:, 0])),
+        "topk_overlap": float(np.mean(overlap)),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare KB embedding backends")
+    parser.add_argument("--backends", default="torch,onnx", help="comma-separated; the first is the reference")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top-k", type=int, default=2)
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    parser.add_argument("--min-topk", type=float, default=0.9)
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.measure, args.repeat)
+        return
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    workdir = tempfile.mkdtemp(prefix="bench-embeddings-")
+    results, embeddings = [], {}
+    for backend in backends:
+        output = os.path.join(workdir, f"{backend}.npz")
+        results.append(_run_backend(backend, output, args.repeat))
+        embeddings[backend] = dict(np.load(output))
+
+    print(f"{'backend':<8} {'load':>8} {'rss':>9} {'single p50':>11} {'p99':>9} {'batch p50':>10}")
+    for r in results:
+        batch = next(v for k, v in r.items() if k.startswith("batch_"))
+        print(f"{r['backend']:<8} {r['load_s']:>7.2f}s {r['rss_backend_mb']:>6.0f} MB "
+              f"{r['single']['p50_ms']:>8.2f} ms {r['single']['p99_ms']:>6.2f} ms {batch['p50_ms']:>7.2f} ms")
+
+    failed = False
+    reference = backends[0]
+    for backend in backends[1:]:
+        p = parity(embeddings[reference], embeddings[backend], args.top_k)
+        ok = p["min_cosine"] >= args.min_cosine and p["topk_overlap"] >= args.min_topk
+        failed |= not ok
+        print(f"parity {backend} vs {reference}: min cosine {p['min_cosine']:.4f}  mean {p['mean_cosine']:.4f}  "
+              f"top-1 {p['top1_agreement']:.0%}  top-{args.top_k} overlap {p['topk_overlap']:.0%}  {'OK' if ok else 'FAIL'}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Micro-benchmark: per-call latency of the agent's date/time parsing.
+#
+# Compares plain dateparser.parse (what the tools used before) with the
+# parsing module, both cold (caches cleared) and warm (cached).
+#
+#   python benchmarks/bench_parsing.py [--repeat 5]
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Make the agent modules importable when run from the repo root or this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dateparser
+
+import parsing
+
+# Realistic things callers say for the date and time of a booking
+DATE_UTTERANCES = [
+    "today", "tonight", "tomorrow", "Tomorrow", "next Friday", "Friday", "this Saturday",
+    "on Sunday", "July 25th", "July 25", "Aug 3rd", "the 14th of February", "2025-12-31",
+    "December 31, 2025", "day after tomorrow", "in two weeks", "next weekend",
+]
+TIME_UTTERANCES = [
+    "7:30 PM", "7 pm", "7 p.m.", "8:00 PM", "19:30", "6:45 pm", "noon", "12:30 PM",
+    "at 7", "11 AM", "9 o'clock", "half past seven",
+]
+
+# Time each call of fn over the corpus, returning per-call latencies in microseconds
+def _time_calls(fn, corpus, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        for text in corpus:
+            start = time.perf_counter()
+            fn(text)
+            samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+def _report(label: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{label:<28} mean {statistics.mean(samples):>10.1f} us   p50 {statistics.median(samples):>10.1f} us   p99 {p99:>10.1f} us")
+
+def _clear_caches() -> None:
+    parsing._parse_date_cached.cache_clear()
+    parsing._parse_time_cached.cache_clear()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Date/time parsing micro-benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = DATE_UTTERANCES + TIME_UTTERANCES
+
+    # Warm up dateparser's own lazy loading so it is not charged to the first sample
+    dateparser.parse("tomorrow")
+
+    _report("dateparser.parse", _time_calls(dateparser.parse, corpus, args.repeat))
+
+    cold = []
+    for _ in range(args.repeat):
+        _clear_caches()
+        cold += _time_calls(parsing.parse_date, DATE_UTTERANCES, 1)
+        cold += _time_calls(parsing.parse_time, TIME_UTTERANCES, 1)
+    _report("parsing (cold cache)", cold)
+
+    warm = _time_calls(parsing.parse_date, DATE_UTTERANCES, args.repeat)
+    warm += _time_calls(parsing.parse_time, TIME_UTTERANCES, args.repeat)
+    _report("parsing (warm cache)", warm)
+
+    print(parsing.cache_info())
+
+if __name__ == "__main__":
+    main()
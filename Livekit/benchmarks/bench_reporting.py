@@ -0,0 +1,157 @@
+# Reporting benchmark: front-of-house queries over a large synthetic dataset.
+#
+# Seeds N reservations spread over a year of dates and booking slots, then times
+# the DatabaseDriver reporting methods:
+#   - list_reservations: paging through one day with keyset cursors
+#   - occupancy_by_slot: covers per 30-minute slot for one day
+#   - occupancy_by_day:  covers per day over a month and over the whole year
+#
+# Backends: "mongomock" (default; runs the MongoBackend queries and aggregation
+# pipelines in-process, but scans every document without indexes, so its timings
+# check the pipelines rather than predict MongoDB), "mongo" (the same pipelines on
+# a real mongod at MONGO_URI, the numbers that matter; data goes to a separate
+# restaurant_bench database that is dropped afterwards) or "memory" (MemoryBackend,
+# the stand-in used by load tests; its numbers say nothing about production reporting).
+#
+# --legacy-fraction seeds that share of rows without a slot, as written before
+# booking slots existed, so paging over them is measured too.
+#
+#   python benchmarks/bench_reporting.py --rows 20000
+#   python benchmarks/bench_reporting.py --backend mongo --rows 1000000
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+
+import db_driver
+
+BENCH_DATABASE = "restaurant_bench"
+
+def _make_backend(name: str):
+    if name == "memory":
+        return db_driver.MemoryBackend()
+    if name == "mongomock":
+        import mongomock
+        return db_driver.MongoBackend(client=mongomock.MongoClient(), database=BENCH_DATABASE)
+    if name == "mongo":
+        from pymongo import MongoClient
+        return db_driver.MongoBackend(client=MongoClient(db_driver.MONGO_URI), database=BENCH_DATABASE)
+    raise ValueError(f"Unknown backend: {name}")
+
+# Synthetic reservations: dinner service, 30-minute slots, 1-8 guests
+def _reservations(rows: int, days: int, seed: int, legacy_fraction: float = 0.0):
+    rng = random.Random(seed)
+    start = date.today()
+    slots = [f"{h:02d}:{m:02d}" for h in range(17, 23) for m in (0, 30)]
+    for i in range(rows):
+        slot = rng.choice(slots)
+        hour, minute = int(slot[:2]), int(slot[3:]) + rng.choice((0, 10, 15, 20))
+        reservation = {
+            "_id": ObjectId(),
+            "name": f"Guest {i}",
+            "phone": f"{rng.randrange(10**9, 10**10)}",
+            "date": (start + timedelta(days=rng.randrange(days))).isoformat(),
+            "time": f"{hour % 12 or 12}:{minute:02d} PM",
+            "slot": slot,
+            "guests": rng.randint(1, 8),
+        }
+        if rng.random() < legacy_fraction:
+            del reservation["slot"]
+        yield reservation
+
+def _seed(backend, name: str, rows: int, days: int, seed: int, legacy_fraction: float) -> None:
+    if name == "memory":
+        for reservation in _reservations(rows, days, seed, legacy_fraction):
+            backend.insert_reservation(reservation)
+        return
+    backend.collection.drop()
+    batch = []
+    for reservation in _reservations(rows, days, seed, legacy_fraction):
+        batch.append(reservation)
+        if len(batch) == 10_000:
+            backend.collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        backend.collection.insert_many(batch, ordered=False)
+
+def _report(label: str, samples: list[float], extra: str = "") -> None:
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{label:<34} n={len(samples):<5} p50 {statistics.median(samples) * 1000:>9.2f} ms   p99 {p99 * 1000:>9.2f} ms  {extra}")
+
+async def run(args) -> None:
+    db_driver.DB_REPORT_TIMEOUT = args.timeout
+    backend = _make_backend(args.backend)
+    driver = db_driver.DatabaseDriver(backend=backend, timeout=args.timeout)
+
+    start = time.perf_counter()
+    _seed(backend, args.backend, args.rows, args.days, args.seed, args.legacy_fraction)
+    driver.ensure_indexes()
+    print(f"seeded {args.rows} reservations over {args.days} days on {args.backend} in {time.perf_counter() - start:.1f}s")
+
+    try:
+        rng = random.Random(args.seed)
+        today = date.today()
+        sample_days = [(today + timedelta(days=rng.randrange(args.days))).isoformat() for _ in range(args.samples)]
+
+        # Page through whole days
+        page_times, rows_seen = [], 0
+        for day in sample_days[: max(1, args.samples // 4)]:
+            cursor = None
+            while True:
+                t = time.perf_counter()
+                page = await driver.list_reservations(day, args.page_size, cursor)
+                page_times.append(time.perf_counter() - t)
+                rows_seen += len(page["reservations"])
+                cursor = page["next_cursor"]
+                if not cursor:
+                    break
+        _report(f"list_reservations (page {args.page_size})", page_times, f"{rows_seen} rows")
+
+        slot_times = []
+        for day in sample_days:
+            t = time.perf_counter()
+            await driver.occupancy_by_slot(day)
+            slot_times.append(time.perf_counter() - t)
+        _report("occupancy_by_slot (1 day)", slot_times)
+
+        month_times = []
+        for day in sample_days[: max(1, args.samples // 4)]:
+            end = (date.fromisoformat(day) + timedelta(days=30)).isoformat()
+            t = time.perf_counter()
+            await driver.occupancy_by_day(day, end)
+            month_times.append(time.perf_counter() - t)
+        _report("occupancy_by_day (31 days)", month_times)
+
+        t = time.perf_counter()
+        days = await driver.occupancy_by_day(today.isoformat(), (today + timedelta(days=args.days)).isoformat())
+        _report("occupancy_by_day (all days)", [time.perf_counter() - t], f"{len(days or [])} days")
+
+        print(f"db metrics: {driver.metrics.snapshot()}")
+    finally:
+        if args.backend != "memory":
+            backend.client.drop_database(BENCH_DATABASE)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark reservation reporting queries")
+    parser.add_argument("--backend", choices=("mongomock", "mongo", "memory"), default="mongomock")
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--samples", type=int, default=20, help="days sampled per query type")
+    parser.add_argument("--page-size", type=int, default=db_driver.DB_PAGE_SIZE)
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds per query")
+    parser.add_argument("--legacy-fraction", type=float, default=0.0, help="share of rows seeded without a slot")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Load test for the token service: tokens/sec and latency percentiles.
+#
+# Start the server first (python server.py, or hypercorn server:app), then:
+#
+#   python benchmarks/bench_token_server.py --requests 2000 --concurrency 50
+#   python benchmarks/bench_token_server.py --room existing-room   # token-only path, no LiveKit API calls
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import aiohttp
+
+async def _worker(session, url, params, count, latencies, errors):
+    for i in range(count):
+        start = time.perf_counter()
+        try:
+            async with session.get(url, params={**params, "name": f"bench_{i}"}) as response:
+                await response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+                    continue
+        except aiohttp.ClientError as e:
+            errors.append(repr(e))
+            continue
+        latencies.append(time.perf_counter() - start)
+
+def _percentile(samples, pct):
+    return samples[min(len(samples) - 1, int(len(samples) * pct))]
+
+async def run(url: str, requests: int, concurrency: int, room: str, call_type: str) -> None:
+    params = {"type": call_type}
+    if room:
+        params["room"] = room
+
+    latencies, errors = [], []
+    per_worker = max(requests // concurrency, 1)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        # One warm-up request so connection setup is not measured
+        await _worker(session, url, params, 1, [], [])
+
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            _worker(session, url, params, per_worker, latencies, errors)
+            for _ in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+
+    if not latencies:
+        print(f"All {len(errors)} requests failed, first error: {errors[0] if errors else None}")
+        return
+
+    latencies.sort()
+    print(f"requests      {len(latencies)} ok, {len(errors)} failed")
+    print(f"throughput    {len(latencies) / elapsed:.1f} tokens/sec")
+    print(f"latency p50   {statistics.median(latencies) * 1000:.2f} ms")
+    print(f"latency p99   {_percentile(latencies, 0.99) * 1000:.2f} ms")
+    print(f"latency max   {latencies[-1] * 1000:.2f} ms")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Token service load test")
+    parser.add_argument("--url", default="http://localhost:5001/getToken")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--room", default="bench-room", help="room to join; pass an empty string to create rooms")
+    parser.add_argument("--type", default="Voice Only")
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.requests, args.concurrency, args.room, args.type))
+
+if __name__ == "__main__":
+    main()
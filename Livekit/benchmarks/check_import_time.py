@@ -0,0 +1,92 @@
+# Import-time budget for the agent module.
+#
+# Every worker spawn, job process and CLI command starts by importing agent.py,
+# so heavy imports there slow all of them down. This runs
+# `python -X importtime -c "import agent"` in a fresh interpreter several times
+# and takes the best run. It fails (exit 1) when the import pulls in a module
+# that should only load on the path that needs it: PyTorch and dateparser on
+# first use. The LiveKit plugins are imported at module level on purpose, since
+# they must register on the main thread (the silero plugin brings ONNX Runtime
+# with it).
+#
+# Wall-clock time depends on the machine, so it only fails the check against a
+# baseline recorded on the same machine: pass --baseline-ms (or set
+# IMPORT_BASELINE_MS) to the time a previous run reported, and the check fails
+# when the import is more than --headroom slower. Without a baseline the time
+# is reported only.
+#
+#   python benchmarks/check_import_time.py [--baseline-ms 3500] [--headroom 0.3] [--top 15]
+
+import argparse
+import os
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be imported as a side effect of `import agent`
+DEFERRED_MODULES = (
+    "sentence_transformers",
+    "torch",
+    "dateparser",
+)
+
+# One -X importtime run: {module: (self_us, cumulative_us, depth)}
+def _import_times(module: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        times[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return times
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check the import-time budget of agent.py")
+    parser.add_argument("--module", default="agent")
+    parser.add_argument("--baseline-ms", type=float, default=float(os.getenv("IMPORT_BASELINE_MS", "0")),
+                        help="import time recorded earlier on this machine; 0 reports the time without checking it")
+    parser.add_argument("--headroom", type=float, default=0.3, help="allowed slowdown over the baseline, as a fraction")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    # Best of several runs, so a busy machine does not fail the check
+    runs = [_import_times(args.module) for _ in range(args.runs)]
+    best = min(runs, key=lambda times: times[args.module][1])
+    total_ms = best[args.module][1] / 1000
+
+    budget_ms = args.baseline_ms * (1 + args.headroom)
+    if args.baseline_ms:
+        print(f"import {args.module}: {total_ms:.0f} ms (baseline {args.baseline_ms:.0f} ms + {args.headroom:.0%} = {budget_ms:.0f} ms, best of {args.runs})")
+    else:
+        print(f"import {args.module}: {total_ms:.0f} ms (no baseline, not checked; best of {args.runs})")
+    direct = sorted(
+        ((name, cumulative) for name, (_, cumulative, depth) in best.items() if depth == 1),
+        key=lambda item: -item[1],
+    )
+    for name, cumulative in direct[:args.top]:
+        print(f"  {cumulative / 1000:>8.1f} ms  {name}")
+
+    failed = False
+    eager = [name for name in DEFERRED_MODULES if name in best]
+    if eager:
+        failed = True
+        print(f"FAIL: imported eagerly: {', '.join(eager)}")
+    if args.baseline_ms and total_ms > budget_ms:
+        failed = True
+        print(f"FAIL: {total_ms - args.baseline_ms:.0f} ms slower than the baseline")
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# Turn-handling check: exactly one reply generation per committed user turn.
+#
+# Builds a real AgentSession around RestaurantAgent with a fake LLM (no room, STT
+# or TTS) and commits caller turns the way end-of-turn detection does. Two cases:
+#   - paced turns: each turn gets one reply, one LLM request, nothing interrupted
+#   - a burst of turns while the LLM is slow: still one reply per turn (never a
+#     second generation on top of the session's own), every superseded reply is
+#     interrupted before it is spoken, and only the last turn is answered
+# TurnMonitor's counters must agree with what the session did, and every LLM request
+# must carry the agent's per-turn context (today's date) exactly once. Exits 1 on failure.
+#
+#   python benchmarks/check_turns.py [--turns 4] [--llm-delay 0.3]
+
+import argparse
+import asyncio
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+# Stand-in database; must be set before the agent module creates its driver
+os.environ.setdefault("DB_BACKEND", "memory")
+
+from livekit.agents import AgentSession
+
+from agent import RestaurantAgent
+from fake_plugins import FakeLLM, commit_user_turn
+from prompts import TURN_CONTEXT_ID, current_date
+from telemetry import LOCAL_EXPORTER, TurnTracer
+from turns import INTERRUPTION_OPTIONS, TurnMonitor
+
+# Run one session; burst commits every turn without waiting for the replies
+async def run_case(turns: int, llm_delay: float, burst: bool) -> dict:
+    fake_llm = FakeLLM(delay=llm_delay)
+    session = AgentSession(llm=fake_llm, turn_handling={"interruption": INTERRUPTION_OPTIONS})
+    monitor = TurnMonitor(session)
+    monitor.attach()
+    handles = []
+    session.on("speech_created", lambda ev: handles.append(ev.speech_handle))
+    await session.start(agent=RestaurantAgent(TurnTracer()))
+
+    for turn in range(turns):
+        commit_user_turn(session, f"Caller utterance {turn}")
+        if burst:
+            await asyncio.sleep(0.01)
+        else:
+            while len(handles) <= turn:
+                await asyncio.sleep(0.01)
+            await handles[turn]
+    while len(handles) < turns:
+        await asyncio.sleep(0.01)
+    await asyncio.gather(*handles)
+    # Let the speech done callbacks run
+    await asyncio.sleep(0.05)
+
+    answered = [h for h in handles if not h.interrupted]
+    await session.aclose()
+    # Requests whose chat context has exactly one context message, and it is current
+    with_context = 0
+    for chat_ctx in fake_llm.requests:
+        notes = [item for item in chat_ctx.items if item.id == TURN_CONTEXT_ID]
+        if len(notes) == 1 and current_date() in notes[0].text_content:
+            with_context += 1
+    return {
+        "llm_requests": fake_llm.calls,
+        "with_context": with_context,
+        "speeches": len(handles),
+        "answered": len(answered),
+        **monitor.stats(),
+    }
+
+def _check(name: str, result: dict, expected: dict) -> bool:
+    wrong = {key: (result[key], value) for key, value in expected.items() if result[key] != value}
+    print(f"{name}: {result}")
+    for key, (got, want) in wrong.items():
+        print(f"  FAIL: {key} = {got}, expected {want}")
+    return not wrong
+
+async def main_async(args) -> bool:
+    turns = args.turns
+    LOCAL_EXPORTER.clear()
+    paced = await run_case(turns, 0.0, burst=False)
+    paced["context_tokens_counted"] = sum(
+        record["count"] for record in LOCAL_EXPORTER.records if record["stage"] == "tokens.dynamic_prompt_tokens_est"
+    ) > 0
+    ok = _check("paced", paced, {
+        "turns": turns, "generated": turns, "speeches": turns, "llm_requests": turns,
+        "with_context": turns, "context_tokens_counted": True, "answered": turns, "interrupted": 0,
+    })
+    burst = await run_case(turns, args.llm_delay, burst=True)
+    ok &= _check("burst", burst, {
+        "turns": turns, "generated": turns, "speeches": turns,
+        "answered": 1, "interrupted": turns - 1, "superseded": turns - 1,
+    })
+    return ok
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check one reply generation per user turn")
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--llm-delay", type=float, default=0.3)
+    args = parser.parse_args()
+
+    ok = asyncio.run(main_async(args))
+    print("OK" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
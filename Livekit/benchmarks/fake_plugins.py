@@ -0,0 +1,166 @@
+# Offline stand-ins for the LiveKit pipeline, shared by the benchmark and check scripts.
+#
+# FakeLLM and FakeTTS are real livekit.agents plugins whose output comes from a
+# callback or a sleep instead of a provider, so an AgentSession built with them runs
+# LiveKit's own turn handling, interruption, tool execution and audio output.
+# FakeAudioOutput stands in for the room's audio track and plays out instantly.
+# FakeJobContext and FakeRoom are the LiveKit stand-ins the agent's entrypoint runs
+# against: the room is never connected, and the caller joins immediately.
+# commit_user_turn feeds a final transcript into the session exactly where
+# end-of-turn detection would, standing in for STT.
+
+import asyncio
+import json
+import time
+import types
+
+from livekit import rtc
+from livekit.agents import llm, tts
+from livekit.agents.voice import io
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS
+from livekit.agents.voice.audio_recognition import _EndOfTurnInfo, _EndOfTurnMetrics
+
+class FakeLLMStream(llm.LLMStream):
+    def __init__(self, fake_llm, *, chat_ctx, tools, conn_options, reply):
+        super().__init__(fake_llm, chat_ctx=chat_ctx, tools=tools, conn_options=conn_options)
+        self._reply = reply
+
+    async def _run(self) -> None:
+        text, tool_calls = self._reply
+        await asyncio.sleep(self._llm.delay)
+        delta = llm.ChoiceDelta(role="assistant", content=text or None, tool_calls=tool_calls)
+        self._event_ch.send_nowait(llm.ChatChunk(id=f"fake-{self._llm.calls}", delta=delta))
+
+class FakeLLM(llm.LLM):
+    def __init__(self, respond=None, delay: float = 0.0):
+        """
+        respond(chat_ctx) returns (text, [llm.FunctionToolCall, ...]) for one LLM request;
+        by default every request gets a fixed line of text. delay is the time to first token.
+        """
+        super().__init__()
+        self.respond = respond or (lambda chat_ctx: ("Certainly.", []))
+        self.delay = delay
+        self.calls = 0
+        self.requests: list[llm.ChatContext] = []
+
+    def chat(self, *, chat_ctx, tools=None, conn_options=DEFAULT_API_CONNECT_OPTIONS, **kwargs):
+        self.calls += 1
+        self.requests.append(chat_ctx.copy())
+        return FakeLLMStream(self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options, reply=self.respond(chat_ctx))
+
+class FakeChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter) -> None:
+        fake_tts = self._tts
+        output_emitter.initialize(
+            request_id=f"fake-{fake_tts.calls}",
+            sample_rate=fake_tts.sample_rate,
+            num_channels=fake_tts.num_channels,
+            mime_type="audio/pcm",
+        )
+        await asyncio.sleep(len(self._input_text) * fake_tts.seconds_per_char)
+        # A short burst of silence, so playout does not dominate the measurements
+        output_emitter.push(b"\x00\x00" * (fake_tts.sample_rate // 100))
+        output_emitter.flush()
+
+class FakeTTS(tts.TTS):
+    def __init__(self, seconds_per_char: float = 0.0, sample_rate: int = 16000):
+        """
+        Synthesis takes seconds_per_char per character of text and yields 10 ms of silence.
+        """
+        super().__init__(capabilities=tts.TTSCapabilities(streaming=False), sample_rate=sample_rate, num_channels=1)
+        self.seconds_per_char = seconds_per_char
+        self.calls = 0
+
+    def synthesize(self, text: str, *, conn_options=DEFAULT_API_CONNECT_OPTIONS):
+        self.calls += 1
+        return FakeChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+class FakeAudioOutput(io.AudioOutput):
+    def __init__(self):
+        super().__init__(label="FakeAudioOutput", capabilities=io.AudioOutputCapabilities(pause=False))
+        self.segments = 0
+        self._pushed = 0.0
+        self._playing = False
+
+    async def capture_frame(self, frame) -> None:
+        await super().capture_frame(frame)
+        if not self._playing:
+            self._playing = True
+            self.on_playback_started(created_at=time.time())
+        self._pushed += frame.duration
+
+    def flush(self) -> None:
+        super().flush()
+        self._finish(interrupted=False)
+
+    def clear_buffer(self) -> None:
+        self._finish(interrupted=True)
+
+    def _finish(self, interrupted: bool) -> None:
+        if not self._playing:
+            return
+        self.segments += 1
+        self.on_playback_finished(playback_position=self._pushed, interrupted=interrupted)
+        self._pushed = 0.0
+        self._playing = False
+
+# Commit a caller utterance as a finished user turn, as end-of-turn detection does
+def commit_user_turn(session, transcript: str) -> None:
+    metrics = _EndOfTurnMetrics(started_speaking_at=None, stopped_speaking_at=None, transcription_delay=0.0, end_of_turn_delay=0.0)
+    session._activity.on_end_of_turn(
+        _EndOfTurnInfo(skip_reply=False, new_transcript=transcript, transcript_confidence=1.0, metrics=metrics)
+    )
+
+class FakeRoom(rtc.EventEmitter):
+    def __init__(self, name: str, metadata: str = ""):
+        super().__init__()
+        self.name = name
+        self.metadata = metadata
+        self.remote_participants = {}
+        self.local_participant = types.SimpleNamespace(
+            identity=f"agent-{name}", sid=f"PA_{name}", kind=rtc.ParticipantKind.PARTICIPANT_KIND_AGENT,
+        )
+
+    def isconnected(self) -> bool:
+        return False
+
+    def register_text_stream_handler(self, *args, **kwargs) -> None:
+        pass
+
+    def unregister_text_stream_handler(self, *args, **kwargs) -> None:
+        pass
+
+    def register_byte_stream_handler(self, *args, **kwargs) -> None:
+        pass
+
+    def unregister_byte_stream_handler(self, *args, **kwargs) -> None:
+        pass
+
+class FakeJobContext:
+    def __init__(self, room_name: str, userdata: dict, call_type: str = "Voice Only", caller: str = "caller"):
+        """
+        userdata stands in for what prewarm puts in proc.userdata (stt, llm, tts, vad, noise_cancellation).
+        """
+        self.job = types.SimpleNamespace(id=f"job-{room_name}")
+        self.room = FakeRoom(room_name, json.dumps({"call_type": call_type}))
+        self.proc = types.SimpleNamespace(userdata=userdata)
+        self.caller = caller
+        self.shutdown_reason = None
+        self._shutdown_callbacks = []
+
+    def add_shutdown_callback(self, callback) -> None:
+        self._shutdown_callbacks.append(callback)
+
+    async def connect(self) -> None:
+        pass
+
+    async def wait_for_participant(self):
+        return types.SimpleNamespace(identity=self.caller)
+
+    def shutdown(self, reason: str = "") -> None:
+        self.shutdown_reason = reason
+
+    # Run the shutdown callbacks, as LiveKit does when the job ends
+    async def run_shutdown(self) -> None:
+        for callback in self._shutdown_callbacks:
+            await callback()
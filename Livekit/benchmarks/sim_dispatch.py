@@ -0,0 +1,211 @@
+# Multi-process dispatch simulation for the worker load function.
+#
+# Each simulated worker has its own state directory, exactly like a real agent
+# worker, and its own pool of job processes, as LiveKit's process pool keeps:
+# a job process prewarms, marks itself ready through worker_state, waits for a
+# job, marks itself busy when it gets one, publishes stats while it burns CPU in
+# bursts and keeps a KB backlog, and exits when the call ends. Like LiveKit's
+# load task, each worker sizes its idle pool from its own reported load, so a
+# load function that reports full too early starves the pool; a job that finds
+# no prewarmed process waits for a cold start.
+# The dispatcher plays the LiveKit server's role: it asks each worker's
+# worker_load.AdmissionControl for its load (the code behind the real load_fnc)
+# and offers each new call to the least-loaded worker below the threshold
+# through the real request function, which accepts it or rejects it at
+# MAX_CONCURRENT_CALLS. Calls are offered as fast as they arrive, without
+# waiting for the previous one to report, so admission races show up as peaks
+# above the cap. The report shows how evenly calls were spread, whether every
+# worker could fill up to the cap, and how many calls hit a cold start.
+#
+#   python benchmarks/sim_dispatch.py --workers 3 --calls 60 --rate 20 [--idle 3] [--prewarm 0.3] [--ignore-cpu]
+
+import argparse
+import asyncio
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import worker_load
+import worker_state
+
+# A simulated job process: prewarm, wait ready for a job, then run the call
+def _job_process(state_dir: str, conn, prewarm: float, seed: int) -> None:
+    os.environ[worker_state.STATE_DIR_ENV] = state_dir
+    time.sleep(prewarm)
+    worker_state.mark_ready(state_dir)
+    conn.send("ready")
+    job = conn.recv()
+    worker_state.mark_busy(state_dir)
+    if job is None:
+        return
+    job_id, duration = job
+    rng = random.Random(seed)
+    end = time.time() + duration
+    while time.time() < end:
+        worker_state.publish_stats({"sessions": 1, "job_id": job_id, "kb_queue": rng.randint(0, 2), "loop_lag": rng.uniform(0.0, 0.02)})
+        # Short CPU burst standing in for KB inference and audio processing
+        burst_end = time.perf_counter() + rng.uniform(0.005, 0.02)
+        while time.perf_counter() < burst_end:
+            pass
+        time.sleep(0.2)
+    worker_state.clear_stats()
+
+# Stand-in for livekit.agents.JobRequest: accepting starts the call
+class SimRequest:
+    def __init__(self, job_id: str, start):
+        self.id = job_id
+        self._start = start
+        self.accepted = False
+
+    async def accept(self) -> None:
+        self.accepted = True
+        self._start()
+
+    async def reject(self) -> None:
+        pass
+
+# One agent worker: its admission control and its pool of job processes
+class SimWorker:
+    def __init__(self, state_dir: str, args, cpu_load, ctx):
+        self.state_dir = state_dir
+        self.args = args
+        self.ctx = ctx
+        self.control = worker_load.AdmissionControl(state_dir, cpu_load=cpu_load)
+        # (process, pipe) of processes prewarming or ready, and of processes running a call
+        self.idle = []
+        self.running = []
+        self.assigned = 0
+        self.cold_starts = 0
+        self.peak = 0
+        self._spawned = 0
+
+    # Jobs still running, as LiveKit's worker.active_jobs
+    @property
+    def active_jobs(self) -> list:
+        self.running = [entry for entry in self.running if entry[0].is_alive()]
+        return self.running
+
+    def load(self) -> float:
+        return self.control.load(self)
+
+    def _spawn(self) -> None:
+        parent, child = self.ctx.Pipe()
+        proc = self.ctx.Process(target=_job_process, args=(self.state_dir, child, self.args.prewarm, self.args.seed * 1000 + self._spawned))
+        proc.start()
+        self._spawned += 1
+        self.idle.append((proc, parent))
+
+    # Size the idle pool from the reported load, as LiveKit's load task does
+    def replenish(self) -> None:
+        target = self.args.idle
+        active = len(self.active_jobs)
+        if active:
+            load = self.load()
+            job_load = load / active
+            if job_load > 0.0:
+                target = min(math.ceil(max(worker_load.LOAD_THRESHOLD - load, 0.0) / job_load), self.args.idle)
+        for _ in range(target - len(self.idle)):
+            self._spawn()
+
+    # Hand an accepted call to a ready process, or wait on a cold start if none is ready
+    def start_call(self, job_id: str, duration: float) -> None:
+        ready = [entry for entry in self.idle if entry[1].poll()]
+        if ready:
+            entry = ready[0]
+        else:
+            self.cold_starts += 1
+            if not self.idle:
+                self._spawn()
+            entry = self.idle[0]
+        self.idle.remove(entry)
+        entry[1].send((job_id, duration))
+        self.running.append(entry)
+        self.assigned += 1
+
+    # Idle processes that have finished prewarming
+    def ready(self) -> int:
+        return worker_state.ready_count(self.state_dir)
+
+    # Release the idle processes and wait for every call to finish
+    def close(self) -> None:
+        for proc, conn in self.idle:
+            conn.send(None)
+        for proc, _ in self.idle:
+            proc.join()
+        for proc, _ in self.running:
+            proc.join()
+
+async def dispatch(args, workers: list[SimWorker]) -> int:
+    rng = random.Random(args.seed)
+    # Workers start with their idle pools prewarmed, as long-running workers are
+    for worker in workers:
+        worker.replenish()
+    while any(worker.ready() < args.idle for worker in workers):
+        await asyncio.sleep(0.05)
+
+    rejected = 0
+    for call in range(args.calls):
+        for worker in workers:
+            worker.replenish()
+        loads = [worker.load() for worker in workers]
+        candidates = [i for i, load in enumerate(loads) if load < worker_load.LOAD_THRESHOLD]
+        if not candidates:
+            rejected += 1
+        else:
+            chosen = workers[min(candidates, key=lambda i: (loads[i], workers[i].assigned))]
+            job_id = f"job-{call}"
+            duration = rng.uniform(0.5, 1.5) * args.duration
+            req = SimRequest(job_id, lambda: chosen.start_call(job_id, duration))
+            await chosen.control.admit(req)
+            if not req.accepted:
+                rejected += 1
+
+        for worker in workers:
+            worker.peak = max(worker.peak, worker.control.active_calls(worker_state.read_stats(state_dir=worker.state_dir)))
+        await asyncio.sleep(rng.expovariate(args.rate))
+    return rejected
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulate load-aware dispatch across local workers")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--calls", type=int, default=60)
+    parser.add_argument("--rate", type=float, default=20.0, help="new calls per second")
+    parser.add_argument("--duration", type=float, default=3.0, help="mean call length in seconds")
+    parser.add_argument("--idle", type=int, default=3, help="prewarmed idle processes per worker (num_idle_processes)")
+    parser.add_argument("--prewarm", type=float, default=0.3, help="seconds a job process takes to prewarm")
+    parser.add_argument("--ignore-cpu", action="store_true", help="leave host CPU out of the load (all workers share one host here)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    state_dirs = [tempfile.mkdtemp(prefix=f"sim-worker-{i}-") for i in range(args.workers)]
+    cpu_load = (lambda: 0.0) if args.ignore_cpu else None
+    ctx = multiprocessing.get_context("spawn")
+    workers = [SimWorker(state_dir, args, cpu_load, ctx) for state_dir in state_dirs]
+    try:
+        rejected = asyncio.run(dispatch(args, workers))
+        for worker in workers:
+            worker.close()
+    finally:
+        for state_dir in state_dirs:
+            shutil.rmtree(state_dir, ignore_errors=True)
+
+    assigned = [worker.assigned for worker in workers]
+    total = sum(assigned)
+    cold = sum(worker.cold_starts for worker in workers)
+    print(f"{total} calls assigned, {rejected} rejected, {cold} cold starts, max {worker_load.MAX_CONCURRENT_CALLS} per worker")
+    for i, worker in enumerate(workers):
+        share = worker.assigned / total if total else 0.0
+        print(f"  worker {i}: {worker.assigned:>4} calls ({share:6.1%})  peak concurrent {worker.peak}  cold starts {worker.cold_starts}")
+    if total:
+        spread = (max(assigned) - min(assigned)) / (total / args.workers)
+        print(f"imbalance (max - min) / mean = {spread:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -4,16 +4,37 @@ import logging
 # Import OS module for environment variable access
 import os
 
+# Async helpers for running blocking driver calls off the event loop
+import asyncio
+import bisect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 # Load environment variables from a .env file
 from dotenv import load_dotenv
 
 # MongoDB client and error classes
-from pymongo import MongoClient
-from pymongo.errors import PyMongoError
+from bson import ObjectId
+import pymongo
+from pymongo import ASCENDING, DESCENDING, MongoClient
+from pymongo.errors import DuplicateKeyError, PyMongoError
 
 # Typing helper for optional return values
 from typing import Optional
 
+# Spoken/typed time parsing shared with the agent tools
+from parsing import parse_time
+
+# Read-through reservation cache and the buses that keep workers' caches consistent
+from reservation_cache import (
+    LOCAL_BUS,
+    RESERVATION_INVALIDATION,
+    ChangeStreamBus,
+    ReservationCache,
+    normalize_phone,
+)
+
 # ---------- Load .env file and initialize MongoDB URI ----------
 
 # Load environment variables from the .env file into the environment
@@ -22,6 +43,28 @@ load_dotenv()
 # Retrieve MongoDB URI from environment variables
 MONGO_URI = os.getenv("MONGO_URI")
 
+# Storage backend: "mongo" for a live database, "memory" for load tests without one
+DB_BACKEND = os.getenv("DB_BACKEND", "mongo")
+
+# Maximum connections per process; also bounds the offload thread pool
+DB_MAX_POOL_SIZE = int(os.getenv("DB_MAX_POOL_SIZE", "10"))
+
+# Per-operation timeout in seconds, enforced by pymongo (timeoutMS) so a timed-out
+# operation is aborted in the driver; the event loop only gives up on the thread
+# at twice this, as a backstop for a driver that never returns
+DB_OP_TIMEOUT = float(os.getenv("DB_OP_TIMEOUT", "2.0"))
+
+# Timeout for reporting queries, which scan a whole day or date range
+DB_REPORT_TIMEOUT = float(os.getenv("DB_REPORT_TIMEOUT", "10.0"))
+
+# Default and largest page size for reservation listings
+DB_PAGE_SIZE = int(os.getenv("DB_PAGE_SIZE", "50"))
+DB_MAX_PAGE_SIZE = 500
+
+# Seating capacity (covers) per booking slot, and slot length in minutes
+SLOT_CAPACITY = int(os.getenv("SLOT_CAPACITY", "40"))
+SLOT_MINUTES = int(os.getenv("SLOT_MINUTES", "30"))
+
 # ---------- Logger Setup ----------
 
 # Create logger with the name "data_base"
@@ -30,45 +73,448 @@ logger = logging.getLogger("data_base")
 # Configure basic logging level to INFO
 logging.basicConfig(level=logging.ERROR)
 
-# ---------- MongoDB Connection Setup ----------
+# ---------- Booking Slots ----------
+
+# Raised when a slot does not have enough covers left for a booking
+class SlotUnavailableError(Exception):
+    pass
+
+# Raised when the caller already holds a different booking in the same slot; carries
+# that booking so the agent can read it back instead of silently replacing the request
+class BookingConflictError(Exception):
+    def __init__(self, existing: dict):
+        super().__init__(f"Phone {existing['phone']} already has a booking at {existing['time']} on {existing['date']}")
+        self.existing = existing
+
+# Map a reservation time onto the start of its booking slot, e.g. "7:40 PM" -> "19:30".
+# Uses the same parser as the agent's availability check, so both agree on the slot;
+# raises ValueError for a time it cannot understand rather than inventing a slot.
+def slot_for(time_str: str, slot_minutes: int = SLOT_MINUTES) -> str:
+    parsed = parse_time(time_str)
+    if parsed is None:
+        raise ValueError(f"Unrecognized reservation time: {time_str!r}")
+    minutes = parsed[0] * 60 + parsed[1]
+    minutes -= minutes % slot_minutes
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+# ---------- Reporting Helpers ----------
+
+# Fields returned by reservation listings
+LIST_PROJECTION = {"name": 1, "phone": 1, "date": 1, "time": 1, "slot": 1, "guests": 1}
+
+# Keyset pagination cursor: the (slot, _id) of the last row on the previous page.
+# Reservations written before booking slots existed have no slot; they sort first
+# (as null does in MongoDB) and their slot is encoded as "", which no real slot is.
+def encode_cursor(slot: Optional[str], oid) -> str:
+    return f"{slot or ''}|{oid}"
+
+def decode_cursor(cursor: str) -> tuple[Optional[str], ObjectId]:
+    slot, _, oid = cursor.rpartition("|")
+    if not ObjectId.is_valid(oid):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return slot or None, ObjectId(oid)
+
+# In-memory sort key matching MongoDB's (slot, _id) order, missing slots first
+def _slot_order(slot: Optional[str], oid) -> tuple:
+    return (slot is not None, slot or "", oid)
+
+# Listing row as returned to callers, with the ObjectId as a string
+def _public_row(row: dict) -> dict:
+    return {"id": str(row["_id"]), **{k: row.get(k) for k in LIST_PROJECTION}}
+
+# ---------- Operation Metrics ----------
+
+class DBMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ops: dict[str, dict] = {}
+
+    # Record the outcome and latency of one database operation
+    def record(self, op: str, seconds: float, outcome: str = "ok") -> None:
+        with self._lock:
+            stats = self._ops.setdefault(op, {"count": 0, "errors": 0, "timeouts": 0, "total_s": 0.0, "max_s": 0.0})
+            stats["count"] += 1
+            stats["total_s"] += seconds
+            stats["max_s"] = max(stats["max_s"], seconds)
+            if outcome == "error":
+                stats["errors"] += 1
+            elif outcome == "timeout":
+                stats["timeouts"] += 1
+
+    # Copy of the counters with the average latency filled in
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                op: {**stats, "avg_s": stats["total_s"] / stats["count"] if stats["count"] else 0.0}
+                for op, stats in self._ops.items()
+            }
+
+# ---------- Storage Backends ----------
+
+class MongoBackend:
+    def __init__(self, uri: Optional[str] = MONGO_URI, max_pool_size: int = DB_MAX_POOL_SIZE, timeout: float = DB_OP_TIMEOUT, client=None, database: str = "restaurant"):
+        try:
+            # Initialize MongoDB client with explicit pool sizing and server-side timeouts;
+            # a ready-made client (e.g. mongomock in benchmarks) can be passed instead
+            self.client = client if client is not None else MongoClient(uri, maxPoolSize=max_pool_size, timeoutMS=int(timeout * 1000))
+
+            # Access the 'restaurant' database (was 'auto_service' earlier)
+            db = self.client[database]
+
+            # Access the 'reservations' collection within the 'restaurant' database
+            self.collection = db["reservations"] # type: ignore
+
+            # Per-slot cover counters used for atomic capacity checks
+            self.slots = db["slot_capacity"]
+
+            # Log successful connection
+            logger.info("MongoDB connection initialized successfully")
+
+        except PyMongoError as e:
+            # Log and raise any connection error
+            logger.error(f"Error connecting to MongoDB: {e}")
+            raise
+
+    def ping(self) -> None:
+        self.client.admin.command("ping")
+
+    def ensure_indexes(self) -> None:
+        self.collection.create_index([("phone", ASCENDING)], name="phone")
+        self.collection.create_index([("date", ASCENDING), ("time", ASCENDING)], name="date_time")
+        # One document per booking key, so a retried create never books twice;
+        # sparse because reservations written before the key existed lack it
+        self.collection.create_index([("booking_key", ASCENDING)], name="booking_key", unique=True, sparse=True)
+        # Keyset pagination of a day's bookings in slot order
+        self.collection.create_index([("date", ASCENDING), ("slot", ASCENDING), ("_id", ASCENDING)], name="date_slot_id")
+        # Covers the occupancy pipelines, which only read date, slot and guests
+        self.collection.create_index([("date", ASCENDING), ("slot", ASCENDING), ("guests", ASCENDING)], name="date_slot_guests")
+
+    # Take covers from a slot in one atomic round trip; False if the slot is full
+    def reserve_slot(self, date: str, slot: str, guests: int, capacity: int) -> bool:
+        if guests > capacity:
+            return False
+        query = {"_id": f"{date}|{slot}", "covers": {"$lte": capacity - guests}}
+        update = {"$inc": {"covers": guests}, "$setOnInsert": {"date": date, "slot": slot}}
+        try:
+            # The filter only matches while enough covers remain; when it does not, the
+            # upsert collides with the existing slot document
+            self.slots.update_one(query, update, upsert=True)
+            return True
+        except DuplicateKeyError:
+            # Either the slot is full, or a concurrent first booking created the slot
+            # document between our match and insert; retry against that document once
+            return self.slots.update_one(query, update).matched_count == 1
+
+    def release_slot(self, date: str, slot: str, guests: int) -> None:
+        self.slots.update_one({"_id": f"{date}|{slot}"}, {"$inc": {"covers": -guests}})
+
+    def slot_covers(self, date: str, slot: str) -> int:
+        doc = self.slots.find_one({"_id": f"{date}|{slot}"}, {"covers": 1})
+        return doc["covers"] if doc else 0
+
+    def insert_reservation(self, reservation: dict) -> None:
+        self.collection.insert_one(reservation)
+
+    # The booking with this idempotency key, if it was already written
+    def find_booking(self, booking_key: str) -> Optional[dict]:
+        return self.collection.find_one({"booking_key": booking_key})
+
+    # Newest reservation under any of the given spellings, matching what the cache
+    # was last written with; the "phone" index serves the $in lookup
+    def find_by_phone(self, phones: list[str]) -> Optional[dict]:
+        return self.collection.find_one({"phone": {"$in": phones}}, sort=[("_id", DESCENDING)])
+
+    # One page of a day's reservations ordered by (slot, _id), starting after the cursor
+    def list_reservations(self, date: str, limit: int, after: Optional[tuple] = None) -> list[dict]:
+        query: dict = {"date": date}
+        if after is not None:
+            slot, oid = after
+            if slot is None:
+                # Still among the rows without a slot; every row with one comes later
+                query["$or"] = [{"slot": {"$type": "string"}}, {"slot": None, "_id": {"$gt": oid}}]
+            else:
+                query["$or"] = [{"slot": {"$gt": slot}}, {"slot": slot, "_id": {"$gt": oid}}]
+        with pymongo.timeout(DB_REPORT_TIMEOUT):
+            cursor = self.collection.find(query, LIST_PROJECTION).sort([("slot", ASCENDING), ("_id", ASCENDING)]).limit(limit)
+            return list(cursor)
+
+    # Bookings and covers per day in [start_date, end_date]
+    def occupancy_by_day(self, start_date: str, end_date: str) -> list[dict]:
+        pipeline = [
+            {"$match": {"date": {"$gte": start_date, "$lte": end_date}}},
+            {"$project": {"_id": 0, "date": 1, "guests": 1}},
+            {"$group": {"_id": "$date", "reservations": {"$sum": 1}, "covers": {"$sum": "$guests"}}},
+            {"$sort": {"_id": 1}},
+        ]
+        with pymongo.timeout(DB_REPORT_TIMEOUT):
+            rows = self.collection.aggregate(pipeline, hint="date_slot_guests")
+            return [{"date": row["_id"], "reservations": row["reservations"], "covers": row["covers"]} for row in rows]
+
+    # Bookings and covers per booking slot on one day
+    def occupancy_by_slot(self, date: str) -> list[dict]:
+        pipeline = [
+            {"$match": {"date": date}},
+            {"$project": {"_id": 0, "slot": 1, "guests": 1}},
+            {"$group": {"_id": "$slot", "reservations": {"$sum": 1}, "covers": {"$sum": "$guests"}}},
+            {"$sort": {"_id": 1}},
+        ]
+        with pymongo.timeout(DB_REPORT_TIMEOUT):
+            rows = self.collection.aggregate(pipeline, hint="date_slot_guests")
+            return [{"slot": row["_id"], "reservations": row["reservations"], "covers": row["covers"]} for row in rows]
+
+class MemoryBackend:
+    def __init__(self):
+        # Reservations keyed by phone number, guarded for use from the offload threads
+        self._lock = threading.Lock()
+        self._by_phone: dict[str, list[dict]] = {}
+        self._by_booking_key: dict[str, dict] = {}
+        self._slots: dict[str, int] = {}
+
+        # Per-day rows kept sorted by (slot, _id), standing in for the date_slot_id index
+        self._day_keys: dict[str, list[tuple]] = {}
+        self._day_rows: dict[str, list[dict]] = {}
 
-try:
-    # Initialize MongoDB client with the URI
-    client = MongoClient(MONGO_URI)
+        # Running [reservations, covers] per day and slot, standing in for the occupancy pipelines
+        self._slot_totals: dict[str, dict[str, list[int]]] = {}
 
-    # Access the 'restaurant' database (was 'auto_service' earlier)
-    db = client["restaurant"]
+    def ping(self) -> None:
+        pass
 
-    # Access the 'reservations' collection within the 'restaurant' database
-    reservations_collection = db["reservations"] # type: ignore
+    def ensure_indexes(self) -> None:
+        pass
 
-    # Log successful connection
-    logger.info("MongoDB connection initialized successfully")
+    def reserve_slot(self, date: str, slot: str, guests: int, capacity: int) -> bool:
+        with self._lock:
+            key = f"{date}|{slot}"
+            covers = self._slots.get(key, 0)
+            if covers + guests > capacity:
+                return False
+            self._slots[key] = covers + guests
+            return True
 
-except PyMongoError as e:
-    # Log and raise any connection error
-    logger.error(f"Error connecting to MongoDB: {e}")
-    raise
+    def release_slot(self, date: str, slot: str, guests: int) -> None:
+        with self._lock:
+            key = f"{date}|{slot}"
+            self._slots[key] = self._slots.get(key, 0) - guests
+
+    def slot_covers(self, date: str, slot: str) -> int:
+        with self._lock:
+            return self._slots.get(f"{date}|{slot}", 0)
+
+    def insert_reservation(self, reservation: dict) -> None:
+        with self._lock:
+            # Same contract as the unique booking_key index
+            booking_key = reservation.get("booking_key")
+            if booking_key in self._by_booking_key:
+                raise DuplicateKeyError(f"Duplicate booking_key: {booking_key}")
+            reservation.setdefault("_id", ObjectId())
+            if booking_key is not None:
+                self._by_booking_key[booking_key] = dict(reservation)
+            self._by_phone.setdefault(reservation["phone"], []).append(dict(reservation))
+
+            key = _slot_order(reservation.get("slot"), reservation["_id"])
+            keys = self._day_keys.setdefault(reservation["date"], [])
+            i = bisect.bisect_right(keys, key)
+            keys.insert(i, key)
+            row = {"_id": reservation["_id"], **{k: reservation.get(k) for k in LIST_PROJECTION}}
+            self._day_rows.setdefault(reservation["date"], []).insert(i, row)
+
+            totals = self._slot_totals.setdefault(reservation["date"], {}).setdefault(reservation.get("slot"), [0, 0])
+            totals[0] += 1
+            totals[1] += reservation["guests"]
+
+    def find_booking(self, booking_key: str) -> Optional[dict]:
+        with self._lock:
+            reservation = self._by_booking_key.get(booking_key)
+            return dict(reservation) if reservation else None
+
+    def find_by_phone(self, phones: list[str]) -> Optional[dict]:
+        with self._lock:
+            matches = [match for phone in phones for match in self._by_phone.get(phone, [])]
+            return dict(max(matches, key=lambda match: match["_id"])) if matches else None
+
+    def list_reservations(self, date: str, limit: int, after: Optional[tuple] = None) -> list[dict]:
+        with self._lock:
+            keys = self._day_keys.get(date, [])
+            start = bisect.bisect_right(keys, _slot_order(*after)) if after is not None else 0
+            return [dict(row) for row in self._day_rows.get(date, [])[start:start + limit]]
+
+    def occupancy_by_day(self, start_date: str, end_date: str) -> list[dict]:
+        with self._lock:
+            days = sorted(d for d in self._slot_totals if start_date <= d <= end_date)
+            return [
+                {
+                    "date": d,
+                    "reservations": sum(n for n, _ in self._slot_totals[d].values()),
+                    "covers": sum(covers for _, covers in self._slot_totals[d].values()),
+                }
+                for d in days
+            ]
+
+    def occupancy_by_slot(self, date: str) -> list[dict]:
+        with self._lock:
+            totals = sorted(self._slot_totals.get(date, {}).items(), key=lambda item: _slot_order(item[0], None)[:2])
+            return [{"slot": slot, "reservations": n, "covers": covers} for slot, (n, covers) in totals]
+
+# Build the backend selected by DB_BACKEND
+def make_backend(name: str = DB_BACKEND):
+    if name == "memory":
+        return MemoryBackend()
+    if name == "mongo":
+        return MongoBackend()
+    raise ValueError(f"Unknown DB_BACKEND: {name}")
+
+# Build the invalidation bus selected by RESERVATION_INVALIDATION
+def make_invalidation_bus(backend, name: str = RESERVATION_INVALIDATION):
+    if name == "changestream" and isinstance(backend, MongoBackend):
+        # Each wait for changes must return well within the client's timeoutMS
+        return ChangeStreamBus(backend.collection, max_await_time_ms=int(DB_OP_TIMEOUT * 1000 / 2))
+    return LOCAL_BUS
 
 # ---------- Reservation Database Driver Class ----------
 
 class DatabaseDriver:
-    def __init__(self):
-        # Initialize the collection reference to use in other methods
-        self.collection = reservations_collection
+    def __init__(self, backend=None, timeout: float = DB_OP_TIMEOUT, max_workers: int = DB_MAX_POOL_SIZE, slot_capacity: int = SLOT_CAPACITY, cache: Optional[ReservationCache] = None, bus=None):
+        # Storage backend used by all methods; built on first use so importing the
+        # agent, or a worker process that never serves a call, opens no MongoDB client
+        self._backend = backend
+        self._backend_lock = threading.Lock()
+        self.timeout = timeout
+        self.slot_capacity = slot_capacity
+        self.metrics = DBMetrics()
+
+        # Reservations by normalized phone; writes anywhere evict entries through the bus.
+        # The default bus may need the backend, so it is set up together with it.
+        self.cache = cache if cache is not None else ReservationCache()
+        self.bus = bus
+        if bus is not None:
+            bus.subscribe(self.cache.invalidate)
+
+        # Blocking driver calls run here so the event loop keeps serving other rooms
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+
+    @property
+    def backend(self):
+        if self._backend is None or self.bus is None:
+            with self._backend_lock:
+                if self._backend is None:
+                    self._backend = make_backend()
+                if self.bus is None:
+                    self.bus = make_invalidation_bus(self._backend)
+                    self.bus.subscribe(self.cache.invalidate)
+        return self._backend
+
+    # Whether the backend is (or, once built, will be) MongoDB, without connecting
+    def uses_mongo(self) -> bool:
+        if self._backend is not None:
+            return isinstance(self._backend, MongoBackend)
+        return DB_BACKEND == "mongo"
+
+    # Run a blocking backend call in the thread pool with a timeout, recording metrics
+    async def _run(self, op: str, fn, *args, timeout: Optional[float] = None):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(loop.run_in_executor(self._executor, fn, *args), 2 * (timeout or self.timeout))
+        except asyncio.TimeoutError:
+            self.metrics.record(op, time.perf_counter() - start, "timeout")
+            raise
+        except Exception:
+            self.metrics.record(op, time.perf_counter() - start, "error")
+            raise
+        self.metrics.record(op, time.perf_counter() - start)
+        return result
+
+    # Round-trip to the server so the connection pool is established before use
+    def ping(self) -> bool:
+        try:
+            self.backend.ping()
+            return True
+        except PyMongoError as e:
+            logger.error(f"Error pinging MongoDB: {e}")
+            return False
+
+    # Create the indexes lookups and slot queries rely on; safe to call on every startup
+    def ensure_indexes(self) -> bool:
+        try:
+            self.backend.ensure_indexes()
+            return True
+        except PyMongoError as e:
+            logger.error(f"Error ensuring MongoDB indexes: {e}")
+            return False
 
-    # Create a new reservation in the MongoDB collection
-    def create_reservation(self, name: str, phone: str, date: str, time: str, guests: int) -> Optional[dict]:
+    # Reserve covers for the slot, then insert, all under one driver-side deadline.
+    # Returns the stored reservation: an earlier attempt's if one already committed.
+    # The booking a retry should get back: the existing one, provided it is the same request
+    @staticmethod
+    def _same_booking(existing: Optional[dict], reservation: dict) -> dict:
+        if existing is None:
+            raise PyMongoError(f"Booking {reservation['booking_key']} vanished after a duplicate key")
+        same = (
+            existing["name"].strip().casefold() == reservation["name"].strip().casefold()
+            and parse_time(existing["time"]) == parse_time(reservation["time"])
+            and existing["guests"] == reservation["guests"]
+        )
+        if not same:
+            raise BookingConflictError(existing)
+        return existing
+
+    def _book(self, reservation: dict) -> dict:
+        date, slot, guests = reservation["date"], reservation["slot"], reservation["guests"]
+        reserved = False
+        try:
+            with pymongo.timeout(self.timeout):
+                existing = self.backend.find_booking(reservation["booking_key"])
+                if existing is not None:
+                    return self._same_booking(existing, reservation)
+                if not self.backend.reserve_slot(date, slot, guests, self.slot_capacity):
+                    raise SlotUnavailableError(f"Not enough seats left at {reservation['time']} on {date}")
+                reserved = True
+                self.backend.insert_reservation(reservation)
+                return reservation
+        except DuplicateKeyError:
+            # A concurrent attempt at the same booking won; give our covers back and use it
+            self.backend.release_slot(date, slot, guests)
+            return self._same_booking(self.backend.find_booking(reservation["booking_key"]), reservation)
+        except PyMongoError as e:
+            # After a timeout the insert may still have committed, so the covers stay
+            # taken; a retry finds that booking by its key instead of booking again
+            if reserved and not e.timeout:
+                self.backend.release_slot(date, slot, guests)
+            raise
+
+    # Number of covers still free in the slot containing the given time, None on error.
+    # Raises ValueError if the time cannot be parsed.
+    async def get_slot_availability(self, date: str, time: str) -> Optional[int]:
+        try:
+            covers = await self._run("get_slot_availability", self.backend.slot_covers, date, slot_for(time))
+            return max(self.slot_capacity - covers, 0)
+        except (asyncio.TimeoutError, PyMongoError) as e:
+            logger.error(f"Error fetching slot availability: {e!r}")
+            return None
+
+    # Create a new reservation in the MongoDB collection.
+    # Raises SlotUnavailableError if the slot is already at capacity, BookingConflictError
+    # if the phone already holds a different booking in that slot, and ValueError if the
+    # time cannot be parsed.
+    async def create_reservation(self, name: str, phone: str, date: str, time: str, guests: int) -> Optional[dict]:
         reservation = {
             "name": name,
-            "phone": phone,
+            "phone": normalize_phone(phone),
             "date": date,
             "time": time,
+            "slot": slot_for(time),
             "guests": guests
         }
+        # Idempotency key: retrying the same booking after a timeout returns it instead of booking twice
+        reservation["booking_key"] = f"{reservation['phone']}|{date}|{reservation['slot']}"
         try:
-            # Insert the reservation document into the MongoDB collection
-            self.collection.insert_one(reservation)
+            # Book the slot and insert the reservation document into the MongoDB collection
+            reservation = await self._run("create_reservation", self._book, reservation)
+
+            # Evict stale copies in other drivers, then write through to our own cache
+            self.bus.publish(reservation["phone"])
+            self.cache.put(reservation["phone"], reservation)
 
             # Log the successful creation
             logger.info(f"Reservation created for phone: {phone}")
@@ -76,19 +522,30 @@ class DatabaseDriver:
             # Return the reservation data
             return reservation
 
+        except asyncio.TimeoutError:
+            logger.error(f"Timed out creating reservation for phone: {phone}")
+            return None
+
         except PyMongoError as e:
             # Log and return None in case of error
             logger.error(f"Error creating reservation: {e}")
             return None
 
-    # Retrieve a reservation document by phone number
-    def get_reservation_by_phone(self, phone: str) -> Optional[dict]:
+    # Retrieve a reservation document by phone number, from the cache when possible
+    async def get_reservation_by_phone(self, phone: str) -> Optional[dict]:
+        key = normalize_phone(phone)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.info(f"Reservation found in cache: {phone}")
+            return cached
+
         try:
-            # Search for a reservation with the matching phone number
-            reservation = self.collection.find_one({"phone": phone})
+            # Search under the normalized number and, for older records, as typed
+            reservation = await self._run("get_reservation_by_phone", self.backend.find_by_phone, list(dict.fromkeys([key, phone])))
 
-            # Log the result of the search
+            # Log the result of the search; only hits are cached so new bookings show up
             if reservation:
+                self.cache.put(key, reservation)
                 logger.info(f"Reservation found: {phone}")
             else:
                 logger.info(f"Reservation not found: {phone}")
@@ -96,7 +553,46 @@ class DatabaseDriver:
             # Return the reservation if found, else None
             return reservation
 
+        except asyncio.TimeoutError:
+            logger.error(f"Timed out fetching reservation for phone: {phone}")
+            return None
+
         except PyMongoError as e:
             # Log and return None if there's an error during fetch
             logger.error(f"Error fetching reservation: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    # One page of a day's reservations in slot order. Pass the returned next_cursor to
+    # get the following page; it is None on the last page. None on error.
+    async def list_reservations(self, date: str, limit: int = DB_PAGE_SIZE, cursor: Optional[str] = None) -> Optional[dict]:
+        limit = max(1, min(limit, DB_MAX_PAGE_SIZE))
+        after = decode_cursor(cursor) if cursor else None
+        try:
+            # Fetch one extra row to know whether another page follows
+            rows = await self._run("list_reservations", self.backend.list_reservations, date, limit + 1, after, timeout=DB_REPORT_TIMEOUT)
+        except (asyncio.TimeoutError, PyMongoError) as e:
+            logger.error(f"Error listing reservations for {date}: {e!r}")
+            return None
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].get("slot"), rows[-1]["_id"])
+        return {"reservations": [_public_row(row) for row in rows], "next_cursor": next_cursor}
+
+    # Bookings and covers per day between two ISO dates (inclusive), None on error
+    async def occupancy_by_day(self, start_date: str, end_date: str) -> Optional[list[dict]]:
+        try:
+            return await self._run("occupancy_by_day", self.backend.occupancy_by_day, start_date, end_date, timeout=DB_REPORT_TIMEOUT)
+        except (asyncio.TimeoutError, PyMongoError) as e:
+            logger.error(f"Error computing daily occupancy: {e!r}")
+            return None
+
+    # Bookings, covers and remaining capacity per booking slot on one day, None on error
+    async def occupancy_by_slot(self, date: str) -> Optional[list[dict]]:
+        try:
+            rows = await self._run("occupancy_by_slot", self.backend.occupancy_by_slot, date, timeout=DB_REPORT_TIMEOUT)
+        except (asyncio.TimeoutError, PyMongoError) as e:
+            logger.error(f"Error computing slot occupancy for {date}: {e!r}")
+            return None
+        return [{**row, "capacity": self.slot_capacity, "remaining": max(self.slot_capacity - row["covers"], 0)} for row in rows]
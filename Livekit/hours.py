@@ -0,0 +1,148 @@
+# Import standard helpers for parsing and file change detection
+import os
+import re
+import threading
+
+# The opening hours live in the same knowledge base file as everything else
+from kb import KB_PATH
+
+# ---------- Opening Hours Schedule ----------
+#
+# The "Timings" section of knowledge.md is parsed once into a weekday -> list of
+# (open, close) intervals table, in minutes since midnight. Overnight intervals
+# keep a close time past 24:00 so they spill into the next day. The table is
+# rebuilt only when the file's modification time changes.
+
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+_DAY_INDEX = {name.lower(): i for i, name in enumerate(DAY_NAMES)}
+_DAY_INDEX.update({name[:3].lower(): i for i, name in enumerate(DAY_NAMES)})
+
+MINUTES_PER_DAY = 24 * 60
+
+# "11:00 AM", "11 AM", "noon" and "midnight"
+_TIME_RE = re.compile(r"(\d{1,2})(?::(\d{2}))?\s*([AP])\.?M\.?|noon|midnight", re.IGNORECASE)
+_DAY_RE = re.compile(r"\b(" + "|".join(sorted(_DAY_INDEX, key=len, reverse=True)) + r")[a-z]*\b", re.IGNORECASE)
+
+class Schedule:
+    def __init__(self, intervals: dict[int, list[tuple[int, int]]]):
+        # Weekday (Monday = 0) -> opening intervals; an empty list means closed all day
+        self.intervals = intervals
+
+    # Whether any hours were found at all
+    def has_hours(self) -> bool:
+        return bool(self.intervals)
+
+    # Whether the KB says anything about this weekday
+    def knows(self, weekday: int) -> bool:
+        return weekday in self.intervals
+
+    # Whether the restaurant is closed for the whole day
+    def is_closed_all_day(self, weekday: int) -> bool:
+        return weekday in self.intervals and not self.intervals[weekday]
+
+    # Whether the restaurant is open at a minute of the given weekday
+    def is_open(self, weekday: int, minute: int) -> bool:
+        for start, end in self.intervals.get(weekday, []):
+            if start <= minute <= end:
+                return True
+        # Overnight hours from the previous day run past midnight
+        for start, end in self.intervals.get((weekday - 1) % 7, []):
+            if end > MINUTES_PER_DAY and minute + MINUTES_PER_DAY <= end:
+                return True
+        return False
+
+    # Human-readable hours for a weekday, e.g. "11:00 AM to 10:00 PM"
+    def describe(self, weekday: int) -> str:
+        intervals = self.intervals.get(weekday)
+        if not intervals:
+            return "closed"
+        return " and ".join(f"{format_minutes(start)} to {format_minutes(end)}" for start, end in intervals)
+
+# Format minutes since midnight as a 12-hour clock time
+def format_minutes(minutes: int) -> str:
+    hour, minute = divmod(minutes % MINUTES_PER_DAY, 60)
+    suffix = "AM" if hour < 12 else "PM"
+    return f"{hour % 12 or 12}:{minute:02d} {suffix}"
+
+# Convert one time match to minutes since midnight
+def _to_minutes(match: re.Match) -> int:
+    word = match.group(0).lower()
+    if word == "noon":
+        return 12 * 60
+    if word == "midnight":
+        return 0
+    hour = int(match.group(1)) % 12
+    if match.group(3).upper() == "P":
+        hour += 12
+    return hour * 60 + int(match.group(2) or 0)
+
+# Expand a day spec such as "Monday to Thursday", "Friday – Saturday" or "Sunday"
+def _parse_days(spec: str) -> list[int]:
+    days = [_DAY_INDEX[m.group(1).lower()] for m in _DAY_RE.finditer(spec)]
+    if len(days) == 2 and re.search(r"\bto\b|[-–—]", spec):
+        start, end = days
+        return [(start + i) % 7 for i in range((end - start) % 7 + 1)]
+    return days
+
+# Return the lines of the "Timings" section of the knowledge base
+def _timings_lines(kb_text: str) -> list[str]:
+    lines = kb_text.split("\n")
+    for i, line in enumerate(lines):
+        if "timings" in line.lower():
+            section = []
+            # The section runs until the next non-bullet line, i.e. the next heading
+            for following in lines[i + 1:]:
+                if following.strip() and not following.lstrip().startswith(("-", "*", "•")):
+                    break
+                section.append(following)
+            return section
+    # Fall back to scanning the whole file for "<days>: <hours>" lines
+    return lines
+
+# Build the weekday table from the knowledge base text
+def parse_hours(kb_text: str) -> Schedule:
+    intervals: dict[int, list[tuple[int, int]]] = {}
+    for line in _timings_lines(kb_text):
+        line = line.strip().lstrip("-*• ").strip()
+        if ":" not in line or not _DAY_RE.match(line):
+            continue
+        day_spec, hours_spec = line.split(":", 1)
+        days = _parse_days(day_spec)
+        if not days:
+            continue
+
+        if "closed" in hours_spec.lower():
+            day_intervals = []
+        else:
+            times = [_to_minutes(m) for m in _TIME_RE.finditer(hours_spec)]
+            if len(times) < 2:
+                continue
+            day_intervals = []
+            for start, end in zip(times[::2], times[1::2]):
+                # Closing at or before opening means the hours run past midnight
+                if end <= start:
+                    end += MINUTES_PER_DAY
+                day_intervals.append((start, end))
+
+        for day in days:
+            intervals[day] = day_intervals
+    return Schedule(intervals)
+
+# ---------- Cached Access ----------
+
+_lock = threading.Lock()
+_cached_mtime = None
+_cached_schedule = None
+
+# Parsed schedule for the KB file, reparsed only when the file changes
+def get_schedule(kb_path: str = KB_PATH) -> Schedule:
+    global _cached_mtime, _cached_schedule
+    mtime = os.stat(kb_path).st_mtime_ns
+    if _cached_schedule is not None and mtime == _cached_mtime:
+        return _cached_schedule
+    with _lock:
+        if _cached_schedule is None or mtime != _cached_mtime:
+            with open(kb_path, "r", encoding="utf-8") as f:
+                _cached_schedule = parse_hours(f.read())
+            _cached_mtime = mtime
+    return _cached_schedule
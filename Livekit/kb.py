@@ -1,48 +1,322 @@
 # Import OS module for file access
 import os
 
-# Import SentenceTransformer for semantic search
-from sentence_transformers import SentenceTransformer, util
+# Import standard helpers for hashing and index metadata
+import hashlib
+import json
+import logging
+from typing import NamedTuple
 
-# Global variables for model, embeddings, and text sections
+# NumPy is used for the on-disk, memory-mapped embedding index
+import numpy as np
+
+# Process-wide cache of answers keyed by query embedding
+from kb_cache import SemanticCache
+
+# Embedding backend (sentence-transformers or ONNX Runtime) selected by config
+from kb_embeddings import embedding_id, load_encoder
+
+# Logger for knowledge base events
+logger = logging.getLogger("knowledge-base")
+
+# ---------- Knowledge Base Paths and Settings ----------
+
+# Resolve files relative to this module so the CWD of the worker does not matter
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Knowledge base source file and the directory holding the precomputed index
+KB_PATH = os.getenv("KB_PATH", os.path.join(BASE_DIR, "knowledge.md"))
+INDEX_DIR = os.getenv("KB_INDEX_DIR", os.path.join(BASE_DIR, "kb_index"))
+
+# Sentence transformer used for both the index and the queries
+MODEL_NAME = os.getenv("KB_MODEL_NAME", "all-MiniLM-L6-v2")
+
+# Model plus backend; embeddings from different backends are never mixed in one index
+EMBEDDING_ID = embedding_id(MODEL_NAME)
+
+# Bump when the chunk layout or embedding format changes so old indexes are rebuilt
+INDEX_VERSION = 3
+
+# Retrieval defaults: hits per query, similarity floor, and chunk size before splitting
+KB_TOP_K = int(os.getenv("KB_TOP_K", "2"))
+KB_MIN_SCORE = float(os.getenv("KB_MIN_SCORE", "0.3"))
+KB_CHUNK_MAX_CHARS = int(os.getenv("KB_CHUNK_MAX_CHARS", "600"))
+
+# Answer returned when nothing in the KB is a strong enough match
+UNKNOWN_ANSWER = "I'm sorry, I couldn't find an answer for that."
+
+# File names inside the index directory. Embedding files are named after the KB
+# hash and meta.json points at the current one, so replacing meta.json switches
+# readers from one complete index to the next in a single step.
+EMBEDDINGS_PREFIX = "embeddings-"
+META_FILE = "meta.json"
+
+# One loaded index: heading-aware chunks, their embeddings and the KB content hash
+class KBIndex(NamedTuple):
+    chunks: list[dict]
+    embeddings: np.ndarray
+    hash: str
+
+# Global variables for the model and the live index. The index is replaced with a
+# single assignment, so a query always sees chunks and embeddings from one version.
 MODEL = None
-SECTION_EMBEDDINGS = None
-SECTIONS = None
+INDEX = None
 
-# Function to get the most relevant answer from the knowledge base using semantic search
-def get_kb_answer(query: str) -> str:
-    global MODEL, SECTION_EMBEDDINGS, SECTIONS
+# Answers for recently asked questions, shared by every session in this process
+ANSWER_CACHE = SemanticCache()
+
+# One retrieved chunk with its heading and cosine similarity
+class KBHit(NamedTuple):
+    text: str
+    heading: str
+    score: float
+
+# ---------- Index Helpers ----------
+
+# Hash the KB contents together with everything that affects the embeddings
+def _content_hash(kb_text: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{INDEX_VERSION}:{EMBEDDING_ID}\n".encode("utf-8"))
+    digest.update(kb_text.encode("utf-8"))
+    return digest.hexdigest()
+
+# Hash one chunk so unchanged chunks can keep their embeddings across rebuilds
+def _chunk_hash(text: str) -> str:
+    return hashlib.sha256(f"{INDEX_VERSION}:{EMBEDDING_ID}\n{text}".encode("utf-8")).hexdigest()
+
+# Read the knowledge base file
+def _read_kb(kb_path: str) -> str:
+    with open(kb_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+# Bullet and emphasis prefixes used for body lines in knowledge.md
+_BODY_PREFIXES = ("-", "*", "•", " ", "\t")
+
+# A heading is a standalone non-bullet line followed by a blank line and then a body
+def _is_heading(lines: list[str], i: int) -> bool:
+    line = lines[i]
+    if not line.strip() or line.startswith(_BODY_PREFIXES) or set(line.strip()) == {"="}:
+        return False
+    if i + 1 < len(lines) and lines[i + 1].strip():
+        return False
+    following = next((l for l in lines[i + 1:] if l.strip()), "")
+    return following.startswith(_BODY_PREFIXES)
 
-    # Lazy-load model and knowledge base only on first use
+# Split a long section body into groups of top-level bullets under the same heading
+def _split_body(heading: str, body: list[str], max_chars: int) -> list[str]:
+    groups: list[list[str]] = []
+    for line in body:
+        if not groups or (line.startswith(("-", "*", "•")) and sum(len(l) + 1 for l in groups[-1]) >= max_chars):
+            groups.append([])
+        groups[-1].append(line)
+    return ["\n".join([heading] + group).strip() for group in groups]
+
+# Split the KB text into chunks at its headings, keeping each heading with its body
+def _split_chunks(kb_text: str, max_chars: int = KB_CHUNK_MAX_CHARS) -> list[dict]:
+    lines = kb_text.split("\n")
+    sections: list[tuple[str, list[str]]] = [("", [])]
+    for i, line in enumerate(lines):
+        if _is_heading(lines, i):
+            sections.append((line.strip(), []))
+        elif line.strip():
+            sections[-1][1].append(line.rstrip())
+
+    chunks = []
+    for heading, body in sections:
+        if not body and not heading:
+            continue
+        text = "\n".join([heading] + body).strip()
+        pieces = [text] if len(text) <= max_chars else _split_body(heading, body, max_chars)
+        chunks.extend({"heading": heading, "text": piece, "hash": _chunk_hash(piece)} for piece in pieces)
+    return chunks
+
+# Load the embedding model once per process
+def _get_model():
+    global MODEL
     if MODEL is None:
-        from tqdm import tqdm  # For progress bar during embedding generation
-        print("Initializing knowledge base...")
+        MODEL = load_encoder(MODEL_NAME)
+    return MODEL
+
+# Read the index metadata, returning None if it is missing or unreadable
+def _read_meta(index_dir: str):
+    try:
+        with open(os.path.join(index_dir, META_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# Map the index files on disk, or None if they are missing or unreadable
+def _read_index(index_dir: str):
+    meta = _read_meta(index_dir)
+    if meta is None:
+        return None
+    try:
+        embeddings = np.load(os.path.join(index_dir, meta["embeddings"]), mmap_mode="r")
+    except (KeyError, OSError, ValueError):
+        return None
+    return KBIndex(meta["chunks"], embeddings, meta.get("hash", ""))
+
+# ---------- Index Build ----------
+
+# Embed the KB chunks and write texts, embeddings and the content hash to disk.
+# Chunks whose hash matches one in the previous index keep its embedding, so an
+# edit to one section only re-encodes that section.
+def build_index(kb_path: str = KB_PATH, index_dir: str = INDEX_DIR, previous=None) -> dict:
+    kb_text = _read_kb(kb_path)
+    chunks = _split_chunks(kb_text)
+
+    if previous is None:
+        previous = _read_index(index_dir)
+    reusable = {}
+    if previous is not None:
+        for chunk, embedding in zip(previous.chunks, previous.embeddings):
+            if "hash" in chunk:
+                reusable[chunk["hash"]] = embedding
+
+    # Normalized embeddings let retrieval be a plain dot product
+    missing = [i for i, chunk in enumerate(chunks) if chunk["hash"] not in reusable]
+    if missing:
+        encoded = _get_model().encode([chunks[i]["text"] for i in missing], normalize_embeddings=True, show_progress_bar=len(missing) > 32)
+        for i, embedding in zip(missing, np.asarray(encoded, dtype=np.float16)):
+            reusable[chunks[i]["hash"]] = embedding
+    embeddings = np.stack([np.asarray(reusable[chunk["hash"]], dtype=np.float16) for chunk in chunks])
+
+    os.makedirs(index_dir, exist_ok=True)
+    content_hash = _content_hash(kb_text)
+    embeddings_file = f"{EMBEDDINGS_PREFIX}{content_hash[:16]}.npy"
+    meta = {
+        "version": INDEX_VERSION,
+        "model": EMBEDDING_ID,
+        "hash": content_hash,
+        "dim": int(embeddings.shape[1]),
+        "embeddings": embeddings_file,
+        "chunks": chunks,
+    }
+
+    # Write to temporary files first and swap them in so readers never see a partial
+    # index; the pid keeps processes rebuilding at the same time from clobbering each other
+    embeddings_tmp = os.path.join(index_dir, f"{embeddings_file}.{os.getpid()}.tmp")
+    meta_tmp = os.path.join(index_dir, f"{META_FILE}.{os.getpid()}.tmp")
+    with open(embeddings_tmp, "wb") as f:
+        np.save(f, embeddings)
+    with open(meta_tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(embeddings_tmp, os.path.join(index_dir, embeddings_file))
+    os.replace(meta_tmp, os.path.join(index_dir, META_FILE))
+
+    # Drop superseded embedding files; processes still mapping one keep it until they swap
+    for name in os.listdir(index_dir):
+        if name.startswith(EMBEDDINGS_PREFIX) and name.endswith(".npy") and name != embeddings_file:
+            try:
+                os.remove(os.path.join(index_dir, name))
+            except FileNotFoundError:
+                pass
 
-        # Read knowledge base content from the file
-        with open("knowledge.md", "r", encoding="utf-8") as f:
-            KB_TEXT = f.read()
+    logger.info(f"Knowledge base index built with {len(chunks)} chunks ({len(missing)} re-encoded) in {index_dir}")
+    return meta
 
-        # Split the KB text into sections separated by double newlines
-        SECTIONS = KB_TEXT.split("\n\n")
+# Map the index from disk, rebuilding it only if the KB file has changed
+def load_index(kb_path: str = KB_PATH, index_dir: str = INDEX_DIR, previous=None) -> KBIndex:
+    current_hash = _content_hash(_read_kb(kb_path))
+    index = _read_index(index_dir)
 
-        # Load pre-trained sentence transformer model for embeddings
-        MODEL = SentenceTransformer("all-MiniLM-L6-v2")
+    if index is None or index.hash != current_hash:
+        logger.info("Knowledge base index missing or stale, rebuilding...")
+        build_index(kb_path, index_dir, previous)
+        index = _read_index(index_dir)
+    return index
 
-        # Generate embeddings for each section of the KB
-        SECTION_EMBEDDINGS = MODEL.encode(SECTIONS, convert_to_tensor=True, show_progress_bar=True)
+# Load the index and the query model; intended to run at worker prewarm
+def load_kb(kb_path: str = KB_PATH, index_dir: str = INDEX_DIR) -> None:
+    global INDEX
+    INDEX = load_index(kb_path, index_dir)
+    _get_model()
 
-    # Encode the user's query into a semantic embedding
-    query_embedding = MODEL.encode(query, convert_to_tensor=True)
+    # Cached answers may refer to a previous version of the KB
+    ANSWER_CACHE.clear()
 
-    # Perform semantic search to find the closest matching section
-    hits = util.semantic_search(query_embedding, SECTION_EMBEDDINGS, top_k=1)
+# Swap in a new index if the KB file changed; returns True when the index was replaced.
+# Another process may already have rebuilt the index on disk, in which case this only maps it.
+def reload_kb(kb_path: str = KB_PATH, index_dir: str = INDEX_DIR) -> bool:
+    global INDEX
+    current_hash = _content_hash(_read_kb(kb_path))
+    if INDEX is not None and INDEX.hash == current_hash:
+        return False
 
-    # If no results found, return fallback message
-    if not hits or not hits[0]:
-        return "I'm sorry, I couldn't find an answer for that."
+    INDEX = load_index(kb_path, index_dir, previous=INDEX)
+    ANSWER_CACHE.clear()
+    logger.info(f"Knowledge base reloaded with {len(INDEX.chunks)} chunks")
+    return True
 
-    # Extract the best match using corpus_id
-    best_match = hits[0][0]
+# ---------- Query ----------
+
+# Encode a batch of queries into normalized embeddings in a single forward pass
+def encode_queries(queries: list[str]) -> np.ndarray:
+    # Fall back to loading on first use if the worker was not prewarmed
+    if INDEX is None or MODEL is None:
+        load_kb()
+    embeddings = MODEL.encode(queries, normalize_embeddings=True, batch_size=max(len(queries), 1))
+    return np.asarray(embeddings, dtype=np.float32).reshape(len(queries), -1)
+
+# Retrieve the top-k chunks above the similarity floor for already-encoded queries
+def search_embeddings(query_embeddings: np.ndarray, top_k: int = KB_TOP_K, min_score: float = KB_MIN_SCORE, index=None) -> list[list[KBHit]]:
+    if index is None:
+        index = INDEX
+    if index is None or not index.chunks:
+        return [[] for _ in query_embeddings]
+    chunks = index.chunks
+
+    # Cosine similarity of every query against every chunk in one matrix product
+    scores = query_embeddings @ np.asarray(index.embeddings, dtype=np.float32).T
+    k = min(top_k, len(chunks))
+
+    results = []
+    for row in scores:
+        best = np.argpartition(-row, k - 1)[:k]
+        best = best[np.argsort(-row[best])]
+        results.append([
+            KBHit(chunks[i]["text"], chunks[i]["heading"], float(row[i]))
+            for i in best if row[i] >= min_score
+        ])
+    return results
+
+# Retrieve the top-k chunks above the similarity floor for a batch of queries
+def search_kb(queries: list[str], top_k: int = KB_TOP_K, min_score: float = KB_MIN_SCORE) -> list[list[KBHit]]:
+    if not queries:
+        return []
+    return search_embeddings(encode_queries(queries), top_k, min_score)
+
+# Turn retrieved hits into the text handed to the LLM
+def format_hits(hits: list[KBHit]) -> str:
+    # Weak matches are not injected into the LLM context
+    if not hits:
+        return UNKNOWN_ANSWER
+    return "\n\n".join(hit.text for hit in hits)
+
+# Answer a batch of questions with one encode call, reusing cached retrievals
+def answer_batch(queries: list[str]) -> list[str]:
+    if not queries:
+        return []
+    query_embeddings = encode_queries(queries)
+    index = INDEX
+
+    # Near-duplicate questions reuse the earlier retrieval
+    answers = [ANSWER_CACHE.get(embedding) for embedding in query_embeddings]
+    misses = [i for i, answer in enumerate(answers) if answer is None]
+    if misses:
+        for i, hits in zip(misses, search_embeddings(query_embeddings[misses], index=index)):
+            answers[i] = format_hits(hits)
+            # Do not cache answers from an index that was swapped out mid-batch
+            if INDEX is index:
+                ANSWER_CACHE.put(query_embeddings[i], answers[i])
+    return answers
+
+# Function to get the most relevant answer from the knowledge base using semantic search
+def get_kb_answer(query: str) -> str:
+    return answer_batch([query])[0]
 
-    # Return the matching section from the knowledge base
-    return SECTIONS[best_match["corpus_id"]]
\ No newline at end of file
+# Build the index offline: python kb.py
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    result = build_index()
+    print(f"Wrote {len(result['chunks'])} chunks to {INDEX_DIR} (hash {result['hash'][:12]})")
@@ -0,0 +1,79 @@
+# Import standard helpers for ordering, locking and expiry
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# NumPy for nearest-neighbour matching of query embeddings
+import numpy as np
+
+# ---------- Semantic Answer Cache ----------
+#
+# Callers ask the same handful of questions in slightly different words. The
+# cache is keyed by normalized query embedding: a new question whose cosine
+# similarity to a cached one is at least the threshold reuses that answer.
+# Entries expire after a TTL and the least recently used entry is evicted
+# once the cache is full.
+
+KB_CACHE_THRESHOLD = float(os.getenv("KB_CACHE_THRESHOLD", "0.92"))
+KB_CACHE_TTL = float(os.getenv("KB_CACHE_TTL", "600"))
+KB_CACHE_SIZE = int(os.getenv("KB_CACHE_SIZE", "256"))
+
+class SemanticCache:
+    def __init__(self, threshold: float = KB_CACHE_THRESHOLD, ttl: float = KB_CACHE_TTL, maxsize: int = KB_CACHE_SIZE):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+        # entry id -> (embedding, value, expiry), least recently used first
+        self._entries: OrderedDict[int, tuple[np.ndarray, object, float]] = OrderedDict()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    # Drop entries whose TTL has passed
+    def _purge_expired(self, now: float) -> None:
+        expired = [key for key, (_, _, expires) in self._entries.items() if expires <= now]
+        for key in expired:
+            del self._entries[key]
+
+    # Return the cached value for the nearest stored query, if it is close enough
+    def get(self, embedding: np.ndarray) -> Optional[object]:
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            if self._entries:
+                keys = list(self._entries)
+                matrix = np.stack([self._entries[key][0] for key in keys])
+                scores = matrix @ np.asarray(embedding, dtype=np.float32)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self._entries.move_to_end(keys[best])
+                    self.hits += 1
+                    return self._entries[keys[best]][1]
+            self.misses += 1
+            return None
+
+    # Store a value for a query embedding, evicting the least recently used entry if full
+    def put(self, embedding: np.ndarray, value: object) -> None:
+        with self._lock:
+            self._entries[next(self._ids)] = (np.asarray(embedding, dtype=np.float32), value, time.monotonic() + self.ttl)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    # Hit/miss counters and current size
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._entries),
+            }
@@ -0,0 +1,97 @@
+# Import standard helpers for configuration
+import logging
+import os
+
+# NumPy holds the embeddings whichever backend produced them
+import numpy as np
+
+# Logger for knowledge base events
+logger = logging.getLogger("knowledge-base")
+
+# ---------- Embedding Backends ----------
+#
+# kb.py only needs encode(texts, normalize_embeddings=..., batch_size=...). The
+# default "torch" backend is SentenceTransformer, which pulls in full PyTorch.
+# On CPU-only workers the "onnx" backend runs the same model exported to ONNX
+# (int8-quantized by default) with onnxruntime and the Rust tokenizer, which
+# imports faster and keeps far less resident memory per job process.
+
+# "torch" (sentence-transformers) or "onnx" (onnxruntime)
+KB_EMBEDDING_BACKEND = os.getenv("KB_EMBEDDING_BACKEND", "torch")
+
+# ONNX model file inside the model repo, and an optional local directory holding it
+# together with tokenizer.json; without one the files are fetched from the Hugging Face hub
+KB_ONNX_FILE = os.getenv("KB_ONNX_FILE", "onnx/model_quint8_avx2.onnx")
+KB_ONNX_MODEL_DIR = os.getenv("KB_ONNX_MODEL_DIR")
+
+# Token limit used by sentence-transformers for the MiniLM models
+KB_MAX_SEQ_LENGTH = int(os.getenv("KB_MAX_SEQ_LENGTH", "256"))
+
+# Inference threads per process; shared with the PyTorch setting in kb_executor
+KB_INFERENCE_THREADS = int(os.getenv("KB_TORCH_THREADS", "1"))
+
+# Identifies the backend in index hashes, so switching backends re-embeds the KB
+def embedding_id(model_name: str, backend: str = KB_EMBEDDING_BACKEND) -> str:
+    if backend == "onnx":
+        return f"{model_name}:onnx:{KB_ONNX_FILE}"
+    return model_name
+
+class OnnxEncoder:
+    def __init__(self, model_name: str, model_file: str = KB_ONNX_FILE, model_dir=KB_ONNX_MODEL_DIR, threads: int = KB_INFERENCE_THREADS, max_seq_length: int = KB_MAX_SEQ_LENGTH):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_path, tokenizer_path = self._resolve(model_name, model_file, model_dir)
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.enable_padding()
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    # Local files when a model directory is configured, otherwise the hub cache
+    @staticmethod
+    def _resolve(model_name: str, model_file: str, model_dir):
+        if model_dir:
+            return os.path.join(model_dir, model_file), os.path.join(model_dir, "tokenizer.json")
+        from huggingface_hub import hf_hub_download
+        repo = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        return hf_hub_download(repo, model_file), hf_hub_download(repo, "tokenizer.json")
+
+    # Same call shape as SentenceTransformer.encode for the arguments kb.py uses
+    def encode(self, texts, normalize_embeddings: bool = False, batch_size: int = 32, **_) -> np.ndarray:
+        if isinstance(texts, str):
+            texts = [texts]
+        batches = [self._encode_batch(texts[i:i + batch_size]) for i in range(0, len(texts), max(batch_size, 1))]
+        embeddings = np.concatenate(batches) if batches else np.zeros((0, 0), dtype=np.float32)
+        if normalize_embeddings and len(embeddings):
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings
+
+    def _encode_batch(self, texts: list[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feed = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feed["token_type_ids"] = np.zeros_like(ids)
+        token_embeddings = self.session.run(None, feed)[0]
+
+        # Mean pooling over real tokens, as the sentence-transformers model does
+        weights = mask[..., None].astype(np.float32)
+        return (token_embeddings * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+
+# Load the encoder for the configured backend
+def load_encoder(model_name: str, backend: str = KB_EMBEDDING_BACKEND):
+    if backend == "onnx":
+        logger.info(f"Loading ONNX embedding model {model_name} ({KB_ONNX_FILE})")
+        return OnnxEncoder(model_name)
+    if backend == "torch":
+        # Import lazily so building or mapping the index never pays for PyTorch unless needed
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+    raise ValueError(f"Unknown KB_EMBEDDING_BACKEND: {backend}")
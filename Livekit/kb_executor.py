@@ -0,0 +1,125 @@
+# Import asyncio and a thread pool for running inference off the event loop
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Knowledge base retrieval that does the actual (blocking) work
+import kb
+from kb_embeddings import KB_EMBEDDING_BACKEND
+
+# Logger for knowledge base events
+logger = logging.getLogger("knowledge-base")
+
+# ---------- Off-Loop KB Inference ----------
+#
+# MODEL.encode is CPU-bound PyTorch. Running it on the event loop stalls audio,
+# STT and TTS for every other room in the worker, so questions are queued here
+# and answered on a dedicated inference thread. Questions that arrive while a
+# batch is being collected are encoded together in one forward pass.
+
+# PyTorch intra-op threads; keep low so inference does not starve the audio pipeline
+KB_TORCH_THREADS = int(os.getenv("KB_TORCH_THREADS", "1"))
+
+# Maximum questions waiting for inference before callers are made to wait
+KB_QUEUE_SIZE = int(os.getenv("KB_QUEUE_SIZE", "64"))
+
+# Micro-batching: largest batch and how long to wait for more questions to arrive
+KB_MAX_BATCH = int(os.getenv("KB_MAX_BATCH", "16"))
+KB_BATCH_WAIT_MS = float(os.getenv("KB_BATCH_WAIT_MS", "5"))
+
+# Limit PyTorch's thread pool for this process; the ONNX backend sizes its own session
+def set_torch_threads(threads: int = KB_TORCH_THREADS) -> None:
+    if KB_EMBEDDING_BACKEND != "torch":
+        return
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+
+class KBInferenceQueue:
+    def __init__(self, max_batch: int = KB_MAX_BATCH, batch_wait_ms: float = KB_BATCH_WAIT_MS, queue_size: int = KB_QUEUE_SIZE):
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait_ms / 1000
+        self.queue_size = queue_size
+        self.batches = 0
+        self.questions = 0
+
+        # A single inference thread; batching, not parallelism, provides the throughput
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kb-inference", initializer=set_torch_threads)
+        self._queue = None
+        self._worker = None
+        self._in_flight = 0
+
+    # Run other work that uses the model, such as a KB reload, on the inference thread
+    def submit(self, fn, *args):
+        return self._executor.submit(fn, *args)
+
+    # Questions queued or currently being encoded
+    def depth(self) -> int:
+        queued = self._queue.qsize() if self._queue is not None else 0
+        return queued + self._in_flight
+
+    # Start the batching task on the running loop if it is not already running
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._worker = asyncio.get_running_loop().create_task(self._batch_loop())
+
+    # Answer one question; concurrent callers are batched into a single encode
+    async def answer(self, question: str) -> str:
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        # Waits here when the queue is full, applying backpressure to callers
+        await self._queue.put((question, future))
+        return await future
+
+    # Collect up to max_batch questions, waiting at most batch_wait after the first
+    async def _next_batch(self) -> list:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.batch_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _batch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+
+            # Skip questions whose callers have already given up
+            batch = [(question, future) for question, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            self._in_flight = len(batch)
+            try:
+                answers = await loop.run_in_executor(self._executor, kb.answer_batch, [question for question, _ in batch])
+            except Exception as e:
+                logger.error(f"KB inference failed for a batch of {len(batch)}: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for (_, future), answer in zip(batch, answers):
+                    if not future.done():
+                        future.set_result(answer)
+            finally:
+                self._in_flight = 0
+                self.batches += 1
+                self.questions += len(batch)
+
+# Process-wide inference queue used by the agent tools
+KB_QUEUE = KBInferenceQueue()
+
+# Answer a question without blocking the event loop
+async def aget_kb_answer(question: str) -> str:
+    return await KB_QUEUE.answer(question)
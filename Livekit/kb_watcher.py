@@ -0,0 +1,78 @@
+# Import standard helpers for the polling thread
+import logging
+import os
+import threading
+
+# Knowledge base whose index is reloaded when the source file changes
+import kb
+
+# Logger for knowledge base events
+logger = logging.getLogger("knowledge-base")
+
+# ---------- Knowledge Base Hot Reload ----------
+#
+# Editing knowledge.md should not need a worker restart. Each job process polls
+# the file's mtime and, once a change has settled, calls kb.reload_kb: only the
+# chunks whose text changed are re-encoded and the new index replaces the old
+# one in a single assignment, while in-flight questions finish on the old one.
+# The opening hours table reloads on its own through hours.get_schedule.
+
+# Seconds between checks of the KB file; 0 disables hot reload
+KB_WATCH_INTERVAL = float(os.getenv("KB_WATCH_INTERVAL", "2"))
+
+class KBWatcher:
+    def __init__(self, submit=None, kb_path: str = kb.KB_PATH, index_dir: str = kb.INDEX_DIR, interval: float = KB_WATCH_INTERVAL):
+        # submit(fn) runs fn where the model is used, e.g. KB_QUEUE.submit; defaults to this thread
+        self.submit = submit
+        self.kb_path = kb_path
+        self.index_dir = index_dir
+        self.interval = interval
+        self.reloads = 0
+        self._mtime = self._current_mtime()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _current_mtime(self):
+        try:
+            return os.stat(self.kb_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="kb-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        pending = None
+        while not self._stop.wait(self.interval):
+            mtime = self._current_mtime()
+            # Missing while an editor swaps the file in, or unchanged since the last reload
+            if mtime is None or mtime == self._mtime:
+                pending = None
+                continue
+            # Wait for one quiet interval so a file still being written is not indexed
+            if mtime != pending:
+                pending = mtime
+                continue
+            self._mtime = mtime
+            pending = None
+            self.check()
+
+    # Reload the index now if the KB content changed; returns True if it was swapped
+    def check(self) -> bool:
+        try:
+            if self.submit is None:
+                changed = kb.reload_kb(self.kb_path, self.index_dir)
+            else:
+                changed = self.submit(kb.reload_kb, self.kb_path, self.index_dir).result()
+        except Exception as e:
+            logger.error(f"Knowledge base reload failed, keeping the current index: {e}")
+            return False
+        if changed:
+            self.reloads += 1
+        return changed
@@ -0,0 +1,139 @@
+# Import standard helpers for date arithmetic and pattern matching
+import re
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Optional
+
+# ---------- Fast Date/Time Parsing ----------
+#
+# Callers mostly say a handful of things: "today", "tomorrow", "next Friday",
+# "7:30 PM", "2025-07-25", "July 25th". Those are matched with plain regexes.
+# Anything else goes to dateparser restricted to English, which skips its
+# language detection. Results are memoized on (text, reference date).
+
+PARSE_CACHE_SIZE = 1024
+
+# dateparser settings for the fallback path
+_DATEPARSER_LANGUAGES = ["en"]
+
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_MONTHS = ["january", "february", "march", "april", "may", "june", "july",
+           "august", "september", "october", "november", "december"]
+_MONTH_INDEX = {name: i + 1 for i, name in enumerate(_MONTHS)}
+_MONTH_INDEX.update({name[:3]: i + 1 for i, name in enumerate(_MONTHS)})
+_MONTH_INDEX["sept"] = 9
+
+_RELATIVE_DAYS = {"today": 0, "tonight": 0, "tomorrow": 1, "tomorrow night": 1, "day after tomorrow": 2}
+
+_ISO_DATE_RE = re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})$")
+_WEEKDAY_RE = re.compile(r"^(?:(this|next|on)\s+)?(" + "|".join(_WEEKDAYS) + r")$")
+_MONTH_PATTERN = "|".join(sorted(_MONTH_INDEX, key=len, reverse=True))
+_MONTH_DAY_RE = re.compile(r"^(" + _MONTH_PATTERN + r")\.?\s+(\d{1,2})(?:st|nd|rd|th)?(?:,?\s+(\d{4}))?$")
+_DAY_MONTH_RE = re.compile(r"^(?:the\s+)?(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?(" + _MONTH_PATTERN + r")\.?(?:,?\s+(\d{4}))?$")
+_TIME_RE = re.compile(r"^(?:at\s+)?(\d{1,2})(?::(\d{2}))?\s*(?:([ap])\.?\s*m\.?)?$")
+
+# Lowercase and collapse whitespace so equivalent utterances share a cache entry
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().replace(",", ", ").split()).strip(" .?!")
+
+# Build a date, returning None for impossible ones such as February 30th
+def _safe_date(year: int, month: int, day: int) -> Optional[date]:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+# Resolve a month/day with no year to the next occurrence on or after the reference date
+def _upcoming(month: int, day: int, year: Optional[str], reference: date) -> Optional[date]:
+    if year:
+        return _safe_date(int(year), month, day)
+    candidate = _safe_date(reference.year, month, day)
+    if candidate and candidate < reference:
+        candidate = _safe_date(reference.year + 1, month, day)
+    return candidate
+
+# Fast path for the common spoken date forms
+def _fast_date(text: str, reference: date) -> Optional[date]:
+    if text in _RELATIVE_DAYS:
+        return reference + timedelta(days=_RELATIVE_DAYS[text])
+
+    match = _ISO_DATE_RE.match(text)
+    if match:
+        return _safe_date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+
+    match = _WEEKDAY_RE.match(text)
+    if match:
+        days_ahead = (_WEEKDAYS.index(match.group(2)) - reference.weekday()) % 7
+        # "next Friday" said on a Friday means a week out; plain "Friday" means today
+        if days_ahead == 0 and match.group(1) == "next":
+            days_ahead = 7
+        return reference + timedelta(days=days_ahead)
+
+    match = _MONTH_DAY_RE.match(text)
+    if match:
+        return _upcoming(_MONTH_INDEX[match.group(1)], int(match.group(2)), match.group(3), reference)
+
+    match = _DAY_MONTH_RE.match(text)
+    if match:
+        return _upcoming(_MONTH_INDEX[match.group(2)], int(match.group(1)), match.group(3), reference)
+
+    return None
+
+# Fast path for clock times such as "7", "7 pm", "7:30 PM" and "19:30"
+def _fast_time(text: str) -> Optional[tuple[int, int]]:
+    if text == "noon":
+        return 12, 0
+    if text == "midnight":
+        return 0, 0
+    match = _TIME_RE.match(text.replace("o'clock", "").strip())
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    meridiem = match.group(3)
+    if minute > 59 or hour > 23 or (meridiem and not 1 <= hour <= 12):
+        return None
+    if meridiem == "p" and hour != 12:
+        hour += 12
+    elif meridiem == "a" and hour == 12:
+        hour = 0
+    return hour, minute
+
+# Restricted-language dateparser fallback for everything else
+def _dateparser_fallback(text: str, reference: date) -> Optional[datetime]:
+    import dateparser
+    return dateparser.parse(
+        text,
+        languages=_DATEPARSER_LANGUAGES,
+        settings={
+            "RELATIVE_BASE": datetime.combine(reference, datetime.min.time()),
+            "PREFER_DATES_FROM": "future",
+        },
+    )
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_date_cached(text: str, reference: date) -> Optional[date]:
+    parsed = _fast_date(text, reference)
+    if parsed is not None:
+        return parsed
+    fallback = _dateparser_fallback(text, reference)
+    return fallback.date() if fallback else None
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_time_cached(text: str, reference: date) -> Optional[tuple[int, int]]:
+    parsed = _fast_time(text)
+    if parsed is not None:
+        return parsed
+    fallback = _dateparser_fallback(text, reference)
+    return (fallback.hour, fallback.minute) if fallback else None
+
+# Parse a spoken date relative to the reference date (today by default)
+def parse_date(text: str, reference: Optional[date] = None) -> Optional[date]:
+    return _parse_date_cached(_normalize(text), reference or date.today())
+
+# Parse a spoken time into (hour, minute)
+def parse_time(text: str, reference: Optional[date] = None) -> Optional[tuple[int, int]]:
+    return _parse_time_cached(_normalize(text), reference or date.today())
+
+# Hit/miss statistics for both caches
+def cache_info() -> dict:
+    return {"date": _parse_date_cached.cache_info()._asdict(), "time": _parse_time_cached.cache_info()._asdict()}
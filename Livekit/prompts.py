@@ -1,12 +1,12 @@
 from datetime import datetime
 
-CURRENT_DATE = datetime.now().strftime("%A, %B %d, %Y")
-
-AGENT_INSTRUCTION = f"""
+# The system prompt is static so the LLM provider can cache it as a prefix across
+# turns and sessions. Anything that changes (today's date, reservation state) goes
+# in the short per-turn context built by turn_context().
+AGENT_INSTRUCTION = """
 You are Ava, a professional customer service assistant for a luxury restaurant.
-Today's date is {CURRENT_DATE}.
 Speak in a warm, polite, and professional tone.
-
+Each turn may include a short context note with today's date and the reservation on file; rely on it.
 
 Correct Example:
 Thank you. I have your number as 123-456-7890. Is that correct?
@@ -22,6 +22,8 @@ Behaviors:
 5. If checking/canceling, ask for the phone number to look up the reservation.
 6. After a tool call, always wait for the tool's result. Use the result to inform your next response or action. Do not re-call a tool with the same parameters unless explicitly instructed by the user or if the previous call failed due to a transient error.
 7. Always thank the user and offer a pleasant farewell.
+
+Until a reservation is on file, work out whether the user wants to check an existing reservation (ask for their phone number) or make a new one (collect full name, phone number read as digits like 123-456-7890, date such as 'tomorrow' or 'July 25th', time as HH:MM AM/PM, and number of guests).
 """
 
 SESSION_INSTRUCTION = """
@@ -36,15 +38,26 @@ Guide them through the full reservation process if they choose to book:
 - number of guests
 """
 
-LOOKUP_RESERVATION_MESSAGE = lambda msg: f"""
-The user has just spoken. Your goal is to either:
-1.  **Assist with an existing reservation:** If the user's message indicates they want to check or modify an existing reservation, ask for their phone number.
-2.  **Start a new reservation:** If the user's message indicates they want to make a new reservation, begin collecting the following details:
-    - Full name
-    - Phone number (read digits only, e.g., 123-456-7890)
-    - Date (e.g., 'tomorrow', 'next Friday', or 'July 25th')
-    - Time (format: HH:MM AM/PM)
-    - Number of guests
-
-Remember to use your tools appropriately as per your main instructions.
-"""
\ No newline at end of file
+# Spoken as-is when a caller rejoins a room whose session was snapshotted
+RESUME_MESSAGE = "Welcome back! Let's pick up right where we left off."
+
+def current_date() -> str:
+    return datetime.now().strftime("%A, %B %d, %Y")
+
+# Small per-turn suffix: today's date and the reservation on file, if any
+def turn_context(reservation: str | None = None) -> str:
+    if reservation:
+        return f"Today is {current_date()}. Reservation on file:\n{reservation}"
+    return f"Today is {current_date()}. No reservation on file yet."
+
+# Chat context id of the per-turn context message, so it is replaced rather than repeated
+TURN_CONTEXT_ID = "turn_context"
+
+# Put the context message at the end of a chat context, dropping the previous one
+def set_turn_context(chat_ctx, context: str) -> None:
+    chat_ctx.items[:] = [item for item in chat_ctx.items if item.id != TURN_CONTEXT_ID]
+    chat_ctx.add_message(role="system", content=context, id=TURN_CONTEXT_ID)
+
+# Rough token count (about four characters per token) for prompt size reporting
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
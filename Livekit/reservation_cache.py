@@ -0,0 +1,168 @@
+# Import standard helpers for the LRU/TTL cache and the invalidation listeners
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+# Logger shared with the database driver
+logger = logging.getLogger("data_base")
+
+# ---------- Reservation Cache Settings ----------
+
+RESERVATION_CACHE_SIZE = int(os.getenv("RESERVATION_CACHE_SIZE", "1024"))
+RESERVATION_CACHE_TTL = float(os.getenv("RESERVATION_CACHE_TTL", "300"))
+
+# How workers tell each other a phone's reservation changed: "local" or "changestream"
+RESERVATION_INVALIDATION = os.getenv("RESERVATION_INVALIDATION", "local")
+
+# ---------- Phone Normalization ----------
+
+# Reduce a phone number to its 10 digits so "123-456-7890", "(123) 456 7890"
+# and "+1 123 456 7890" all share one cache entry and one stored form
+def normalize_phone(phone: str) -> str:
+    digits = re.sub(r"\D", "", phone or "")
+    if len(digits) == 11 and digits.startswith("1"):
+        digits = digits[1:]
+    return digits or (phone or "").strip()
+
+# ---------- LRU + TTL Cache ----------
+
+class ReservationCache:
+    def __init__(self, maxsize: int = RESERVATION_CACHE_SIZE, ttl: float = RESERVATION_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        # normalized phone -> (reservation, expiry), least recently used first
+        self._entries: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, phone: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(phone)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[phone]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(phone)
+            self.hits += 1
+            return dict(entry[0])
+
+    def put(self, phone: str, reservation: dict) -> None:
+        with self._lock:
+            self._entries[phone] = (dict(reservation), time.monotonic() + self.ttl)
+            self._entries.move_to_end(phone)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    # Drop one phone's entry; None drops every entry (the bus may have missed changes)
+    def invalidate(self, phone: Optional[str]) -> None:
+        with self._lock:
+            if phone is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(phone, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+# ---------- Invalidation Buses ----------
+
+# In-process pub/sub: every driver in this process hears every write.
+# Subscribers get the normalized phone, or None when every entry may be stale.
+class InProcessBus:
+    def __init__(self):
+        self._subscribers: list[Callable[[Optional[str]], None]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[Optional[str]], None]) -> None:
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def publish(self, phone: Optional[str]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            callback(phone)
+
+    def close(self) -> None:
+        pass
+
+# Server error codes after which a change stream cannot be resumed from its token
+_UNRESUMABLE_CODES = (280, 286)  # ChangeStreamFatalError, ChangeStreamHistoryLost
+
+# Cross-worker invalidation from MongoDB change streams (requires a replica set).
+# Writes are announced by MongoDB itself, so publish is a local no-op.
+#   - After an interruption the stream resumes after the last change seen, so
+#     writes made while it was down still invalidate; if that is no longer
+#     possible, every cached entry is dropped instead.
+#   - Deletes carry no document; the phone comes from the pre-image when the
+#     collection has changeStreamPreAndPostImages enabled, otherwise the whole
+#     cache is dropped.
+#   - max_await_time_ms keeps each wait for new changes under the client's
+#     timeoutMS, so an idle stream does not time out.
+class ChangeStreamBus(InProcessBus):
+    def __init__(self, collection, max_await_time_ms: int = 1000):
+        super().__init__()
+        self.collection = collection
+        self.max_await_time_ms = max_await_time_ms
+        self._stream = None
+        self._resume_token = None
+        self._thread = threading.Thread(target=self._watch, name="reservation-changes", daemon=True)
+        self._thread.start()
+
+    def publish(self, phone: Optional[str]) -> None:
+        pass
+
+    # The phone a change affects, or None if it cannot be told
+    @staticmethod
+    def _changed_phone(change: dict) -> Optional[str]:
+        document = change.get("fullDocument") or change.get("fullDocumentBeforeChange") or {}
+        phone = document.get("phone")
+        return normalize_phone(phone) if phone else None
+
+    def _watch(self) -> None:
+        from pymongo.errors import OperationFailure, PyMongoError
+        while True:
+            try:
+                with self.collection.watch(
+                    full_document="updateLookup",
+                    full_document_before_change="whenAvailable",
+                    resume_after=self._resume_token,
+                    max_await_time_ms=self.max_await_time_ms,
+                ) as stream:
+                    self._stream = stream
+                    for change in stream:
+                        super().publish(self._changed_phone(change))
+                        self._resume_token = stream.resume_token
+            except OperationFailure as e:
+                if e.code not in _UNRESUMABLE_CODES:
+                    logger.error(f"Reservation change stream interrupted, retrying: {e}")
+                else:
+                    # Changes since the token are gone; start fresh and forget everything cached
+                    logger.error(f"Reservation change stream cannot resume, clearing caches: {e}")
+                    self._resume_token = None
+                    super().publish(None)
+                time.sleep(1.0)
+            except PyMongoError as e:
+                logger.error(f"Reservation change stream interrupted, retrying: {e}")
+                time.sleep(1.0)
+            finally:
+                self._stream = None
+
+    def close(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+
+# Process-wide in-process bus shared by every driver
+LOCAL_BUS = InProcessBus()
@@ -0,0 +1,126 @@
+import asyncio
+import collections
+import os
+import time
+import uuid
+
+# ---------- Warm Room Pool ----------
+#
+# Creating a room, dispatching the agent and waiting for it to connect and start
+# its AgentSession takes a few seconds. The pool does that ahead of time for each
+# call type and hands out a ready room on request, refilling in the background.
+# Rooms that sit unused for longer than max_age are discarded and replaced.
+
+def parse_pool_sizes(spec, default_size):
+    """
+    Parses "Voice Only=2,Voice + Avatar=1" into {"Voice Only": 2, "Voice + Avatar": 1}.
+    Entries without "=" use default_size.
+    """
+    sizes = {}
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        call_type, _, size = entry.partition("=")
+        sizes[call_type.strip()] = int(size) if size.strip() else default_size
+    return sizes
+
+# Target number of ready rooms per call type. Off by default: every pooled room keeps
+# an agent job running, so pooling is opted into per deployment (e.g. ROOM_POOL_SIZE=2)
+ROOM_POOL_SIZE = int(os.getenv("ROOM_POOL_SIZE", "0"))
+ROOM_POOL_SIZES = parse_pool_sizes(os.getenv("ROOM_POOL_SIZES", "Voice Only,Voice + Avatar=0"), ROOM_POOL_SIZE)
+
+# Seconds a pre-created room may wait before it is recycled
+ROOM_POOL_MAX_AGE = float(os.getenv("ROOM_POOL_MAX_AGE", "600"))
+
+# Pause before retrying after a failed room preparation
+ROOM_POOL_RETRY_DELAY = 5.0
+
+class RoomPool:
+    def __init__(self, prepare_room, discard_room, sizes=None, max_age=ROOM_POOL_MAX_AGE):
+        """
+        prepare_room(room_name, call_type) -> bool creates the room and returns once the agent is connected.
+        discard_room(room_name) deletes a room that is no longer wanted.
+        """
+        self.prepare_room = prepare_room
+        self.discard_room = discard_room
+        self.sizes = dict(ROOM_POOL_SIZES if sizes is None else sizes)
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+
+        # call type -> deque of (room name, ready timestamp), oldest first
+        self._rooms = {call_type: collections.deque() for call_type in self.sizes}
+        self._wakeups = {call_type: asyncio.Event() for call_type in self.sizes}
+        self._tasks = []
+
+    async def start(self):
+        for call_type, size in self.sizes.items():
+            if size > 0:
+                self._tasks.append(asyncio.create_task(self._refill_loop(call_type)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+        # Tear down rooms that were never handed out
+        for rooms in self._rooms.values():
+            while rooms:
+                await self.discard_room(rooms.popleft()[0])
+
+    def acquire(self, call_type):
+        """
+        Returns a ready room name for the call type, or None if the pool is empty.
+        Hands out the newest room; expired ones are left at the front of the queue
+        for the refill loop to discard, woken up here.
+        """
+        rooms = self._rooms.get(call_type)
+        if rooms and time.monotonic() - rooms[-1][1] < self.max_age:
+            self.hits += 1
+            self._wakeups[call_type].set()
+            return rooms.pop()[0]
+        self.misses += 1
+        if call_type in self._wakeups:
+            self._wakeups[call_type].set()
+        return None
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "ready": {call_type: len(rooms) for call_type, rooms in self._rooms.items()},
+        }
+
+    async def _drop_expired(self, call_type):
+        rooms = self._rooms[call_type]
+        now = time.monotonic()
+        while rooms and now - rooms[0][1] >= self.max_age:
+            await self.discard_room(rooms.popleft()[0])
+
+    async def _refill_loop(self, call_type):
+        rooms = self._rooms[call_type]
+        wakeup = self._wakeups[call_type]
+        while True:
+            await self._drop_expired(call_type)
+
+            while len(rooms) < self.sizes[call_type]:
+                room_name = "room-" + str(uuid.uuid4())[:8]
+                try:
+                    ready = await self.prepare_room(room_name, call_type)
+                except Exception as e:
+                    print(f"Warning: Could not prepare pooled room '{room_name}'. Error: {e}")
+                    ready = False
+                if not ready:
+                    await self.discard_room(room_name)
+                    await asyncio.sleep(ROOM_POOL_RETRY_DELAY)
+                    continue
+                rooms.append((room_name, time.monotonic()))
+                print(f"Pooled room '{room_name}' ready for call type: {call_type}")
+
+            # Sleep until a room is handed out or the oldest one is due for recycling
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=self.max_age / 2)
+            except asyncio.TimeoutError:
+                pass
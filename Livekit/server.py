@@ -1,58 +1,63 @@
 import os
 import json
-import asyncio
 import uuid
-from flask import Flask, request
+import asyncio
+import hmac
+from datetime import datetime
+from quart import Quart, request
+from quart_cors import cors
 from dotenv import load_dotenv
-from flask_cors import CORS
 from livekit import api
+from room_pool import RoomPool
+from db_driver import DB_PAGE_SIZE, DatabaseDriver
 
 # Load environment variables from a .env file
 load_dotenv()
 
-# Initialize Flask app
-app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*"}})
+# LiveKit credentials, read once at startup
+LIVEKIT_URL = os.getenv("LIVEKIT_URL")
+LIVEKIT_API_KEY = os.getenv("LIVEKIT_API_KEY")
+LIVEKIT_API_SECRET = os.getenv("LIVEKIT_API_SECRET")
 
-# This async function encapsulates all the necessary async LiveKit API calls
-async def create_room_and_generate_token(room_name, participant_identity, participant_name, call_type):
-    """
-    Creates a LiveKit room if it doesn't exist and generates an access token for a participant.
-    """
-    livekit_url = os.getenv("LIVEKIT_URL")
-    api_key = os.getenv("LIVEKIT_API_KEY")
-    api_secret = os.getenv("LIVEKIT_API_SECRET")
+# Seconds to wait for the dispatched agent to join a pooled room
+AGENT_CONNECT_TIMEOUT = float(os.getenv("AGENT_CONNECT_TIMEOUT", "20"))
 
-    # Initialize the LiveKit API client
-    livekit_api = api.LiveKitAPI(livekit_url, api_key, api_secret)
+# Key required in the X-API-Key header of the reservation and report routes;
+# without one configured those routes are refused, since they expose guest data
+REPORTS_API_KEY = os.getenv("REPORTS_API_KEY")
 
-    # If no room name is provided by the client, generate a unique one
-    if not room_name:
-        room_name = "room-" + str(uuid.uuid4())[:8]
-        print(f"No room name provided, creating a new room: {room_name}")
-        try:
-            # Create the room with the specified call_type in its metadata AND dispatch your specific agent
-            await livekit_api.room.create_room(
-                api.CreateRoomRequest(
-                    name=room_name,
-                    metadata=json.dumps({"call_type": call_type}),
-                    # IMPORTANT: Dispatch your specific named agent
-                    agents=[
-                        api.RoomAgentDispatch(
-                            agent_name="restaurant-video-agent",  # Must match your agent.py
-                            metadata=json.dumps({"call_type": call_type})
-                        )
-                    ]
-                )
-            )
-            print(f"Room '{room_name}' created with agent dispatch for call type: {call_type}")
-        except Exception as e:
-            # This might fail if the room already exists, which is not a critical error in this flow.
-            print(f"Warning: Could not create room '{room_name}'. It may already exist. Error: {e}")
-            pass
-
-    # Create an access token for the participant
-    access_token = api.AccessToken(api_key, api_secret)
+# Initialize Quart app (async, ASGI) with CORS open to the frontend
+app = Quart(__name__)
+app = cors(app, allow_origin="*")
+
+# One long-lived LiveKit API client (and HTTP session) shared by every request
+livekit_api = None
+
+# Pre-created rooms with the agent already connected, split by call type
+room_pool = None
+
+# Reservation database for the front-of-house views; connects on first query
+db = DatabaseDriver()
+
+@app.before_serving
+async def open_livekit_api():
+    global livekit_api, room_pool
+    livekit_api = api.LiveKitAPI(LIVEKIT_URL, LIVEKIT_API_KEY, LIVEKIT_API_SECRET)
+    room_pool = RoomPool(prepare_pooled_room, delete_room)
+    await room_pool.start()
+
+@app.after_serving
+async def close_livekit_api():
+    if room_pool is not None:
+        await room_pool.stop()
+    if livekit_api is not None:
+        await livekit_api.aclose()
+
+def generate_token(room_name, participant_identity, participant_name):
+    """
+    Mints an access token for a participant. Pure CPU, no network calls.
+    """
+    access_token = api.AccessToken(LIVEKIT_API_KEY, LIVEKIT_API_SECRET)
     access_token.with_identity(participant_identity)
     access_token.with_name(participant_name)
     access_token.with_grants(
@@ -61,17 +66,85 @@ async def create_room_and_generate_token(room_name, participant_identity, partic
             room=room_name
         )
     )
+    return access_token.to_jwt()
+
+async def create_room(room_name, call_type):
+    """
+    Creates a LiveKit room with the call type in its metadata and dispatches the agent to it.
+    Returns True if the room was created.
+    """
+    try:
+        # Create the room with the specified call_type in its metadata AND dispatch your specific agent
+        await livekit_api.room.create_room(
+            api.CreateRoomRequest(
+                name=room_name,
+                metadata=json.dumps({"call_type": call_type}),
+                # IMPORTANT: Dispatch your specific named agent
+                agents=[
+                    api.RoomAgentDispatch(
+                        agent_name="restaurant-video-agent",  # Must match your agent.py
+                        metadata=json.dumps({"call_type": call_type})
+                    )
+                ]
+            )
+        )
+        print(f"Room '{room_name}' created with agent dispatch for call type: {call_type}")
+        return True
+    except Exception as e:
+        # This might fail if the room already exists, which is not a critical error in this flow.
+        print(f"Warning: Could not create room '{room_name}'. It may already exist. Error: {e}")
+        return False
+
+async def wait_for_agent(room_name, timeout=AGENT_CONNECT_TIMEOUT):
+    """
+    Polls the room until the dispatched agent has joined. Returns False on timeout.
+    """
+    deadline = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < deadline:
+        response = await livekit_api.room.list_participants(api.ListParticipantsRequest(room=room_name))
+        if any(p.kind == api.ParticipantInfo.Kind.AGENT for p in response.participants):
+            return True
+        await asyncio.sleep(0.5)
+    return False
+
+async def prepare_pooled_room(room_name, call_type):
+    """
+    Creates a room for the pool and waits until the agent is connected and waiting for a caller.
+    """
+    return await create_room(room_name, call_type) and await wait_for_agent(room_name)
 
-    # Close the API client session
-    await livekit_api.aclose()
+async def delete_room(room_name):
+    """
+    Deletes a room, ignoring rooms that are already gone.
+    """
+    try:
+        await livekit_api.room.delete_room(api.DeleteRoomRequest(room=room_name))
+    except Exception as e:
+        print(f"Warning: Could not delete room '{room_name}'. Error: {e}")
+
+async def create_room_and_generate_token(room_name, participant_identity, participant_name, call_type):
+    """
+    Creates a LiveKit room if no room name is given and generates an access token for a participant.
+    """
+    # If no room name is provided by the client, hand out a warm room with the agent already connected
+    if not room_name and room_pool is not None:
+        room_name = room_pool.acquire(call_type)
+        if room_name:
+            print(f"Using pooled room '{room_name}' for call type: {call_type}")
+
+    # Otherwise fall back to creating a new room now
+    if not room_name:
+        room_name = "room-" + str(uuid.uuid4())[:8]
+        print(f"No room name provided, creating a new room: {room_name}")
+        await create_room(room_name, call_type)
 
     # Return the generated JWT
-    return access_token.to_jwt()
+    return generate_token(room_name, participant_identity, participant_name)
 
 @app.route("/getToken")
-def get_token():
+async def get_token():
     """
-    Synchronous Flask route to handle token generation requests.
+    Async route to handle token generation requests.
     """
     # Get parameters from the client's request
     participant_identity = request.args.get("name", "user_" + str(uuid.uuid4())[:4])
@@ -79,17 +152,86 @@ def get_token():
     call_type = request.args.get("type", "Voice Only")
 
     try:
-        # Run the async function from this synchronous route to get the token
-        jwt = asyncio.run(
-            create_room_and_generate_token(
-                room_name, participant_identity, participant_identity, call_type
-            )
+        return await create_room_and_generate_token(
+            room_name, participant_identity, participant_identity, call_type
         )
-        return jwt
     except Exception as e:
         print(f"Error generating token: {e}")
         return str(e), 500
 
+def check_reports_access():
+    """
+    Returns an error response if the request lacks the reports API key, else None.
+    Fails closed: with no key configured every request is refused.
+    """
+    if not REPORTS_API_KEY:
+        return {"error": "reports are disabled, REPORTS_API_KEY is not set"}, 503
+    if not hmac.compare_digest(request.headers.get("X-API-Key", ""), REPORTS_API_KEY):
+        return {"error": "unauthorized"}, 401
+    return None
+
+def parse_iso_date(value):
+    """
+    Validates a YYYY-MM-DD date query parameter, returning it or None.
+    """
+    try:
+        return datetime.strptime(value or "", "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+@app.route("/reservations")
+async def list_reservations():
+    """
+    One page of a day's reservations in slot order: ?date=YYYY-MM-DD[&limit=N][&cursor=...]
+    """
+    denied = check_reports_access()
+    if denied:
+        return denied
+    date = parse_iso_date(request.args.get("date"))
+    if not date:
+        return {"error": "date must be YYYY-MM-DD"}, 400
+    try:
+        limit = int(request.args.get("limit", DB_PAGE_SIZE))
+        page = await db.list_reservations(date, limit, request.args.get("cursor"))
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    if page is None:
+        return {"error": "database unavailable"}, 503
+    return page
+
+@app.route("/reports/occupancy/days")
+async def occupancy_by_day():
+    """
+    Bookings and covers per day: ?start=YYYY-MM-DD&end=YYYY-MM-DD
+    """
+    denied = check_reports_access()
+    if denied:
+        return denied
+    start = parse_iso_date(request.args.get("start"))
+    end = parse_iso_date(request.args.get("end", request.args.get("start")))
+    if not start or not end:
+        return {"error": "start and end must be YYYY-MM-DD"}, 400
+    days = await db.occupancy_by_day(start, end)
+    if days is None:
+        return {"error": "database unavailable"}, 503
+    return {"start": start, "end": end, "days": days}
+
+@app.route("/reports/occupancy/slots")
+async def occupancy_by_slot():
+    """
+    Bookings, covers and remaining capacity per booking slot: ?date=YYYY-MM-DD
+    """
+    denied = check_reports_access()
+    if denied:
+        return denied
+    date = parse_iso_date(request.args.get("date"))
+    if not date:
+        return {"error": "date must be YYYY-MM-DD"}, 400
+    slots = await db.occupancy_by_slot(date)
+    if slots is None:
+        return {"error": "database unavailable"}, 503
+    return {"date": date, "slots": slots}
+
 if __name__ == "__main__":
-    # Run the Flask app
-    app.run(host="0.0.0.0", port=5001, debug=True)
\ No newline at end of file
+    # Run the Quart app
+    app.run(host="0.0.0.0", port=5001, debug=True)
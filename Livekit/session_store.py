@@ -0,0 +1,170 @@
+# Import standard helpers for serialization, expiry and the backend lock
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+# Errors from the optional MongoDB backend
+from pymongo.errors import PyMongoError
+
+# Storage backend the reservations use
+from db_driver import DB_BACKEND
+
+# Logger for session snapshot events
+logger = logging.getLogger("session-store")
+
+# ---------- Session Snapshots ----------
+#
+# A caller who drops and rejoins the same room should not have to repeat their
+# phone number, nor should the agent redo the lookup and the LLM turns. Each
+# (room, caller identity) keeps a small snapshot: the reservation fields plus the
+# last few user and agent messages, trimmed. It is written whenever the
+# reservation changes and when a call ends unexpectedly, and deleted when the
+# call ends normally. The next session in that room restores it straight into
+# the agent's state and chat context, but only for the same caller.
+#
+# Backends: "mongo" keeps snapshots next to the reservations, where the job that
+# serves the reconnect (always a new process) can find them. "memory" lives and
+# dies with one job process, so it never resumes a real call; it is only for
+# tests and load runs with DB_BACKEND=memory. The default follows DB_BACKEND.
+
+SESSION_STORE_BACKEND = os.getenv("SESSION_STORE", "mongo" if DB_BACKEND == "mongo" else "memory")
+
+# How long a snapshot stays resumable after its last update
+SESSION_TTL = float(os.getenv("SESSION_TTL", "1800"))
+
+# Condensed history: how many recent messages are kept, and characters per message
+SESSION_HISTORY_MESSAGES = int(os.getenv("SESSION_HISTORY_MESSAGES", "12"))
+SESSION_MESSAGE_CHARS = int(os.getenv("SESSION_MESSAGE_CHARS", "300"))
+
+# Keep the last user/assistant messages of a chat context as short role/text pairs
+def condense_history(chat_ctx, max_messages: int = SESSION_HISTORY_MESSAGES, max_chars: int = SESSION_MESSAGE_CHARS) -> list[dict]:
+    history = []
+    for item in chat_ctx.items:
+        if getattr(item, "type", None) != "message" or item.role not in ("user", "assistant"):
+            continue
+        text = (item.text_content or "").strip()
+        if text:
+            history.append({"role": item.role, "text": text[:max_chars]})
+    return history[-max_messages:]
+
+# Snapshots are per caller in a room, so another participant never resumes someone else's call
+def snapshot_key(room: str, identity: str) -> str:
+    return f"{room}|{identity}"
+
+# Build the snapshot stored for a caller
+def make_snapshot(identity: str, reservation: dict, chat_ctx, call_type: str) -> dict:
+    return {
+        "identity": identity,
+        "reservation": reservation,
+        "history": condense_history(chat_ctx),
+        "call_type": call_type,
+        "ts": time.time(),
+    }
+
+# Compact JSON, so snapshots stay small in memory and on the wire
+def dumps(snapshot: dict) -> str:
+    return json.dumps(snapshot, separators=(",", ":"), ensure_ascii=False)
+
+# A snapshot is only resumed by the caller it was saved for
+def _checked(snapshot: dict, identity: str) -> Optional[dict]:
+    if snapshot.get("identity") != identity:
+        logger.warning("Ignoring session snapshot saved for a different caller")
+        return None
+    return snapshot
+
+class MemorySessionStore:
+    def __init__(self, ttl: float = SESSION_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshots: dict[str, tuple[str, float]] = {}
+
+    async def save(self, room: str, identity: str, snapshot: dict) -> None:
+        data = dumps(snapshot)
+        now = time.monotonic()
+        with self._lock:
+            # Drop expired snapshots while we hold the lock anyway
+            for key in [k for k, (_, expires) in self._snapshots.items() if expires <= now]:
+                del self._snapshots[key]
+            self._snapshots[snapshot_key(room, identity)] = (data, now + self.ttl)
+
+    async def load(self, room: str, identity: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._snapshots.get(snapshot_key(room, identity))
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return _checked(json.loads(entry[0]), identity)
+
+    async def delete(self, room: str, identity: str) -> None:
+        with self._lock:
+            self._snapshots.pop(snapshot_key(room, identity), None)
+
+class MongoSessionStore:
+    def __init__(self, db, ttl: float = SESSION_TTL):
+        # db is the DatabaseDriver; its MongoDB connection is only opened on first use
+        self.db = db
+        self.ttl = ttl
+        self._collection = None
+
+    # Snapshots live next to the reservations, expired by MongoDB through a TTL index
+    def _get_collection(self):
+        if self._collection is None:
+            collection = self.db.backend.collection.database["session_snapshots"]
+            collection.create_index("expires_at", name="expires_at", expireAfterSeconds=0)
+            self._collection = collection
+        return self._collection
+
+    def _save(self, key: str, snapshot: dict) -> None:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+        self._get_collection().replace_one({"_id": key}, {"_id": key, "data": dumps(snapshot), "expires_at": expires_at}, upsert=True)
+
+    def _load(self, key: str) -> Optional[dict]:
+        doc = self._get_collection().find_one({"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}}, {"data": 1})
+        return json.loads(doc["data"]) if doc else None
+
+    def _delete(self, key: str) -> None:
+        self._get_collection().delete_one({"_id": key})
+
+    # Driver calls go through the DatabaseDriver's pool, timeout and metrics like any
+    # reservation query; a failed snapshot never fails the call
+    async def save(self, room: str, identity: str, snapshot: dict) -> None:
+        try:
+            await self.db._run("session_save", self._save, snapshot_key(room, identity), snapshot)
+        except asyncio.TimeoutError:
+            logger.error(f"Timed out saving session snapshot for room {room}")
+        except PyMongoError as e:
+            logger.error(f"Error saving session snapshot for room {room}: {e}")
+
+    async def load(self, room: str, identity: str) -> Optional[dict]:
+        try:
+            snapshot = await self.db._run("session_load", self._load, snapshot_key(room, identity))
+        except asyncio.TimeoutError:
+            logger.error(f"Timed out loading session snapshot for room {room}")
+            return None
+        except PyMongoError as e:
+            logger.error(f"Error loading session snapshot for room {room}: {e}")
+            return None
+        return _checked(snapshot, identity) if snapshot else None
+
+    async def delete(self, room: str, identity: str) -> None:
+        try:
+            await self.db._run("session_delete", self._delete, snapshot_key(room, identity))
+        except asyncio.TimeoutError:
+            logger.error(f"Timed out deleting session snapshot for room {room}")
+        except PyMongoError as e:
+            logger.error(f"Error deleting session snapshot for room {room}: {e}")
+
+# Build the store selected by SESSION_STORE
+def make_session_store(name: str = SESSION_STORE_BACKEND, db=None):
+    if name == "memory":
+        return MemorySessionStore()
+    if name == "mongo":
+        # Snapshots share the reservations' MongoDB connection, so there must be one
+        if db is None or not db.uses_mongo():
+            raise ValueError("SESSION_STORE=mongo needs a DatabaseDriver on MongoDB (DB_BACKEND=mongo)")
+        return MongoSessionStore(db)
+    raise ValueError(f"Unknown SESSION_STORE: {name}")
@@ -0,0 +1,334 @@
+# Import standard helpers for timing and structured logs
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+
+# Logger for per-turn timing records
+logger = logging.getLogger("telemetry")
+
+# ---------- Per-Turn Latency Telemetry ----------
+#
+# Every stage of a turn (STT final, LLM first token, each tool call, TTS first
+# byte, playout) is recorded once and fanned out to three sinks:
+#   - Prometheus histograms labelled by stage and call_type (room names are left
+#     out of metric labels to keep cardinality bounded)
+#   - OpenTelemetry spans tagged with room and call_type
+#   - a local in-memory exporter used by tests and the benchmark harness
+# Prometheus and OpenTelemetry are optional; without them only the local
+# exporter and the structured log line are produced.
+
+# Port for the worker's Prometheus endpoint; 0 disables it
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+
+# OTLP collector for spans (e.g. http://localhost:4318/v1/traces); unset disables export
+OTLP_TRACES_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT", os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", ""))
+
+# Histogram buckets in seconds, from fast tools up to slow LLM turns
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0)
+
+class LocalExporter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.records: list[dict] = []
+
+    def export(self, record: dict) -> None:
+        with self._lock:
+            self.records.append(record)
+
+    # Durations in seconds recorded for a stage
+    def durations(self, stage: str) -> list[float]:
+        with self._lock:
+            return [r["seconds"] for r in self.records if r["stage"] == stage]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.records.clear()
+
+# Process-wide local exporter
+LOCAL_EXPORTER = LocalExporter()
+
+_histogram = None
+_tracer = None
+_sinks_lock = threading.Lock()
+
+# Point Prometheus at a shared directory so job-process metrics can be served by the worker.
+# Must run before prometheus_client is imported anywhere in this process tree.
+def init_multiprocess(state_dir: str) -> None:
+    metrics_dir = os.path.join(state_dir, "prometheus")
+    os.makedirs(metrics_dir, exist_ok=True)
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", metrics_dir)
+
+# Serve the metrics of every job process from the worker process
+def start_metrics_server(port: int = METRICS_PORT) -> None:
+    if not port:
+        return
+    try:
+        from prometheus_client import CollectorRegistry, multiprocess, start_http_server
+    except ImportError:
+        logger.warning("prometheus_client not installed, metrics endpoint disabled")
+        return
+    registry = CollectorRegistry()
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.MultiProcessCollector(registry)
+    try:
+        start_http_server(port, registry=registry)
+    except OSError as e:
+        # Typically a second worker on the same host; give each worker its own METRICS_PORT
+        logger.warning(f"Metrics endpoint disabled, could not listen on port {port}: {e}")
+
+_tracer_provider = None
+
+# Export spans (ours and LiveKit's) over OTLP from this process. Call once per job
+# process; without an endpoint or the OpenTelemetry SDK, spans stay no-ops.
+def init_tracing(endpoint: str = OTLP_TRACES_ENDPOINT, service_name: str = "restaurant-agent") -> None:
+    global _tracer_provider
+    if not endpoint or _tracer_provider is not None:
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning("opentelemetry-sdk or the OTLP exporter not installed, span export disabled")
+        return
+    provider = TracerProvider(resource=Resource.create({SERVICE_NAME: service_name}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint)))
+    trace.set_tracer_provider(provider)
+    try:
+        from livekit.agents.telemetry import set_tracer_provider
+        set_tracer_provider(provider)
+    except ImportError:
+        pass
+    _tracer_provider = provider
+
+# Push out buffered spans before a job process exits
+async def flush_traces() -> None:
+    if _tracer_provider is not None:
+        await asyncio.to_thread(_tracer_provider.force_flush)
+
+# Create the Prometheus histogram and OpenTelemetry tracer on first use
+def _sinks():
+    global _histogram, _tracer
+    if _histogram is None and _tracer is None:
+        with _sinks_lock:
+            if _histogram is None:
+                try:
+                    from prometheus_client import Histogram
+                    _histogram = Histogram(
+                        "agent_stage_seconds",
+                        "Latency of each stage of an agent turn",
+                        ["stage", "call_type"],
+                        buckets=LATENCY_BUCKETS,
+                    )
+                except ImportError:
+                    _histogram = False
+            if _tracer is None:
+                try:
+                    from opentelemetry import trace
+                    _tracer = trace.get_tracer("restaurant-agent")
+                except ImportError:
+                    _tracer = False
+    return _histogram, _tracer
+
+# Send one stage timing to every sink
+def record(stage: str, seconds: float, room: str = "", call_type: str = "", **attributes) -> None:
+    end = time.time()
+    entry = {"stage": stage, "seconds": seconds, "room": room, "call_type": call_type, **attributes}
+    LOCAL_EXPORTER.export(entry)
+
+    histogram, tracer = _sinks()
+    if histogram:
+        histogram.labels(stage=stage, call_type=call_type).observe(seconds)
+    if tracer:
+        start_ns = int((end - seconds) * 1e9)
+        span = tracer.start_span(stage, start_time=start_ns, attributes={"room": room, "call_type": call_type, **attributes})
+        span.end(end_time=int(end * 1e9))
+
+_counter = None
+
+# Count a discrete event (e.g. a reply generation that was skipped) per call type
+def increment(event: str, call_type: str = "", amount: int = 1) -> None:
+    global _counter
+    LOCAL_EXPORTER.export({"stage": f"event.{event}", "seconds": 0.0, "count": amount, "call_type": call_type})
+    if _counter is None:
+        with _sinks_lock:
+            if _counter is None:
+                try:
+                    from prometheus_client import Counter
+                    _counter = Counter("agent_turn_events_total", "Turn scheduling events", ["event", "call_type"])
+                except ImportError:
+                    _counter = False
+    if _counter:
+        _counter.labels(event=event, call_type=call_type).inc(amount)
+
+_token_counter = None
+
+# Count LLM prompt/completion tokens per call type, apart from the turn scheduling events
+def count_tokens(kind: str, call_type: str = "", amount: int = 1) -> None:
+    global _token_counter
+    LOCAL_EXPORTER.export({"stage": f"tokens.{kind}", "seconds": 0.0, "count": amount, "call_type": call_type})
+    if _token_counter is None:
+        with _sinks_lock:
+            if _token_counter is None:
+                try:
+                    from prometheus_client import Counter
+                    _token_counter = Counter("agent_llm_tokens_total", "LLM tokens by kind", ["kind", "call_type"])
+                except ImportError:
+                    _token_counter = False
+    if _token_counter:
+        _token_counter.labels(kind=kind, call_type=call_type).inc(amount)
+
+class TurnTracer:
+    def __init__(self, room: str = "", call_type: str = ""):
+        self.room = room
+        self.call_type = call_type
+        self.turns = 0
+        self._turn_start = None
+        self._speaking_since = None
+        self._stages: dict[str, float] = {}
+        self._tokens: dict[str, int] = {}
+        self._next_tokens: dict[str, int] = {}
+
+    # Record a stage for this session and attach it to the current turn
+    def record(self, stage: str, seconds: float, **attributes) -> None:
+        record(stage, seconds, self.room, self.call_type, **attributes)
+        if self._turn_start is not None:
+            self._stages[stage] = self._stages.get(stage, 0.0) + seconds
+
+    # Time a block of work, e.g. a tool call or a database query
+    @contextlib.contextmanager
+    def stage(self, name: str, **attributes):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, **attributes)
+
+    # The caller's committed end of utterance starts a new turn; started_at
+    # (a perf_counter value) backdates it to when they actually stopped speaking
+    def start_turn(self, started_at=None) -> None:
+        if self._turn_start is not None:
+            self.end_turn()
+        self._turn_start = time.perf_counter() if started_at is None else started_at
+        self._speaking_since = None
+        self._stages = {}
+        self._tokens, self._next_tokens = self._next_tokens, {}
+        self.turns += 1
+
+    # Seconds since the current turn started, or None outside a turn
+    def since_turn_start(self):
+        return None if self._turn_start is None else time.perf_counter() - self._turn_start
+
+    # Close the turn and emit one structured log line with every stage
+    def end_turn(self) -> None:
+        if self._turn_start is None:
+            return
+        total = time.perf_counter() - self._turn_start
+        record("turn", total, self.room, self.call_type)
+        logger.info(json.dumps({
+            "event": "turn",
+            "room": self.room,
+            "call_type": self.call_type,
+            "turn": self.turns,
+            "total_s": round(total, 4),
+            "stages_s": {k: round(v, 4) for k, v in self._stages.items()},
+            "tokens": self._tokens,
+        }))
+        self._turn_start = None
+
+    # Count prompt tokens for this turn, both in the turn log and as a counter
+    def add_tokens(self, kind: str, count: int) -> None:
+        if count <= 0:
+            return
+        self._tokens[kind] = self._tokens.get(kind, 0) + count
+        count_tokens(kind, self.call_type, count)
+
+    # Count prompt tokens for the turn about to start, e.g. from the turn-completed hook,
+    # which runs before the turn's EOUMetrics
+    def add_next_turn_tokens(self, kind: str, count: int) -> None:
+        if count <= 0:
+            return
+        self._next_tokens[kind] = self._next_tokens.get(kind, 0) + count
+        count_tokens(kind, self.call_type, count)
+
+    # Translate LiveKit pipeline metrics into stage timings and token counts
+    def on_metrics(self, metrics) -> None:
+        kind = type(metrics).__name__
+        if kind == "EOUMetrics":
+            # Emitted once per committed user turn, after the end-of-utterance delay and
+            # the turn-completed hook; a final transcript alone may be one of several
+            self.start_turn(time.perf_counter() - metrics.end_of_utterance_delay - metrics.on_user_turn_completed_delay)
+            self.record("stt_final", metrics.transcription_delay)
+            self.record("end_of_utterance", metrics.end_of_utterance_delay)
+        elif kind == "LLMMetrics":
+            if metrics.ttft >= 0:
+                self.record("llm_ttft", metrics.ttft)
+            self.add_tokens("prompt_tokens", metrics.prompt_tokens)
+            self.add_tokens("prompt_cached_tokens", metrics.prompt_cached_tokens)
+            self.add_tokens("completion_tokens", metrics.completion_tokens)
+        elif kind == "TTSMetrics" and metrics.ttfb >= 0:
+            self.record("tts_ttfb", metrics.ttfb)
+
+    # Agent audio started: time-to-first-audio; back to listening: playout, from speaking to done
+    def on_agent_state(self, old_state: str, new_state: str) -> None:
+        elapsed = self.since_turn_start()
+        if elapsed is None:
+            return
+        if new_state == "speaking":
+            self._speaking_since = time.perf_counter()
+            self.record("time_to_first_audio", elapsed)
+        elif old_state == "speaking":
+            if self._speaking_since is not None:
+                self.record("playout", time.perf_counter() - self._speaking_since)
+                self._speaking_since = None
+            self.end_turn()
+
+    # Subscribe to an AgentSession's events
+    def attach(self, session) -> None:
+        @session.on("metrics_collected")
+        def _on_metrics(ev):
+            self.on_metrics(ev.metrics)
+
+        @session.on("agent_state_changed")
+        def _on_agent_state(ev):
+            self.on_agent_state(ev.old_state, ev.new_state)
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.05):
+        # How often to probe; lag is how late each wakeup is
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task = None
+
+    # Most recent lag in seconds
+    @property
+    def current(self) -> float:
+        return self.samples[-1] if self.samples else 0.0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - expected, 0.0)
+            self.samples.append(lag)
+            # Keep a bounded window of recent samples
+            if len(self.samples) > 1200:
+                del self.samples[:600]
@@ -0,0 +1,87 @@
+# Import logging and OS modules for error reports and environment variable access
+import logging
+import os
+
+# Turn events are exported alongside the latency metrics
+import telemetry
+
+# ---------- Per-Session Turn Monitor ----------
+#
+# The AgentSession runs at most one reply per committed user turn: when a newer
+# turn is committed it interrupts the reply in flight (cancelling its LLM and
+# TTS), and a reply whose turn was superseded before it could speak is dropped
+# unplayed. How eagerly caller speech interrupts the agent is set by
+# INTERRUPTION_OPTIONS, passed to the session as its turn handling. The monitor
+# watches that pipeline rather than starting replies of its own:
+#   - turns: committed user turns (one EOUMetrics each)
+#   - generated: replies the session created (speech_created)
+#   - interrupted: replies cut short by the caller
+#   - superseded: replies interrupted before any of their text was spoken,
+#     i.e. LLM/TTS work cancelled before the caller heard it
+# Unrecoverable session errors are passed to on_error.
+
+# Minimum seconds of caller speech, and words once transcribed, that interrupt the agent
+INTERRUPTION_MIN_DURATION = float(os.getenv("INTERRUPTION_MIN_DURATION", "0.5"))
+INTERRUPTION_MIN_WORDS = int(os.getenv("INTERRUPTION_MIN_WORDS", "0"))
+
+# Interruption settings for AgentSession(turn_handling={"interruption": ...})
+INTERRUPTION_OPTIONS = {
+    "enabled": True,
+    "min_duration": INTERRUPTION_MIN_DURATION,
+    "min_words": INTERRUPTION_MIN_WORDS,
+}
+
+class TurnMonitor:
+    def __init__(self, session, on_error=None, call_type: str = ""):
+        """
+        on_error(error) is called with the error of each unrecoverable session error event.
+        """
+        self.session = session
+        self.on_error = on_error
+        self.call_type = call_type
+
+        self.turns = 0
+        self.generated = 0
+        self.interrupted = 0
+        self.superseded = 0
+
+    # Subscribe to the session's turn, speech and error events
+    def attach(self) -> None:
+        @self.session.on("metrics_collected")
+        def _on_metrics(ev):
+            if type(ev.metrics).__name__ == "EOUMetrics":
+                self.turns += 1
+
+        @self.session.on("speech_created")
+        def _on_speech_created(ev):
+            self.generated += 1
+            ev.speech_handle.add_done_callback(self._on_speech_done)
+
+        @self.session.on("error")
+        def _on_error(ev):
+            if getattr(ev.error, "recoverable", True):
+                return
+            if self.on_error is None:
+                logging.error(f"Unrecoverable session error: {ev.error}")
+            else:
+                self.on_error(ev.error)
+
+    def _on_speech_done(self, handle) -> None:
+        if not handle.interrupted:
+            return
+        self.interrupted += 1
+        telemetry.increment("reply_interrupted", self.call_type)
+        # Nothing reached the chat context, so the reply never got to the caller
+        if not any(getattr(item, "text_content", None) for item in handle.chat_items):
+            self.superseded += 1
+            telemetry.increment("reply_superseded", self.call_type)
+
+    # Turn counters; saved is the replies whose LLM/TTS work was cut off unheard
+    def stats(self) -> dict:
+        return {
+            "turns": self.turns,
+            "generated": self.generated,
+            "interrupted": self.interrupted,
+            "superseded": self.superseded,
+            "saved": self.superseded,
+        }
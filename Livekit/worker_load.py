@@ -0,0 +1,134 @@
+# Import standard helpers for configuration and the reporting loop
+import asyncio
+import contextlib
+import logging
+import os
+import time
+
+# CPU usage of the whole worker host
+import psutil
+
+# Shared state written by job processes and read by the worker
+import worker_state
+
+# ---------- Load Reporting and Call Admission ----------
+#
+# LiveKit assigns rooms to the worker with the lowest reported load. Plain CPU
+# load misses what actually degrades calls here: too many concurrent sessions,
+# a backed-up KB inference queue and event-loop lag. Each job process publishes
+# those through worker_state, and the worker folds them into one load figure.
+
+# Hard cap on concurrent calls per worker
+MAX_CONCURRENT_CALLS = int(os.getenv("MAX_CONCURRENT_CALLS", "8"))
+
+# Load at which the worker stops taking new calls; a worker reaches it exactly at MAX_CONCURRENT_CALLS
+LOAD_THRESHOLD = float(os.getenv("LOAD_THRESHOLD", "0.75"))
+
+# KB questions waiting per process, and event-loop lag in seconds, that count as fully loaded
+KB_QUEUE_BUDGET = int(os.getenv("KB_QUEUE_BUDGET", "8"))
+LOOP_LAG_BUDGET = float(os.getenv("LOOP_LAG_BUDGET", "0.1"))
+
+# Seconds to let active calls finish after a shutdown signal
+DRAIN_TIMEOUT = int(os.getenv("AGENT_DRAIN_TIMEOUT", "1800"))
+
+# How often job processes report their stats
+STATS_INTERVAL = 1.0
+
+# Seconds an accepted job holds its slot before its process has reported stats
+ADMISSION_GRACE = float(os.getenv("ADMISSION_GRACE", "15"))
+
+# Combine session count, per-process pressure and CPU into a 0..1 load figure.
+# Sessions are scaled so a full worker (max_calls) sits exactly at the threshold,
+# so the load threshold and the hard cap in admit() turn calls away at the same point.
+def compute_load(active_sessions: int, job_stats: list[dict], cpu: float, max_calls: int = MAX_CONCURRENT_CALLS, threshold: float = LOAD_THRESHOLD) -> float:
+    session_load = threshold * active_sessions / max_calls if max_calls else 1.0
+    queue_load = max((s.get("kb_queue", 0) / KB_QUEUE_BUDGET for s in job_stats), default=0.0)
+    lag_load = max((s.get("loop_lag", 0.0) / LOOP_LAG_BUDGET for s in job_stats), default=0.0)
+    return min(max(session_load, queue_load, lag_load, cpu), 1.0)
+
+# Per-worker admission state. A job process only shows up in worker_state once it
+# has started and published stats, so jobs accepted in the meantime are held as
+# pending admissions and counted as active until their stats appear.
+class AdmissionControl:
+    def __init__(self, state_dir: str | None = None, max_calls: int = MAX_CONCURRENT_CALLS, grace: float = ADMISSION_GRACE, cpu_load=None):
+        # state_dir defaults to this worker's; cpu_load() returns host CPU use in 0..1
+        self.state_dir = state_dir
+        self.max_calls = max_calls
+        self.grace = grace
+        self.cpu_load = cpu_load or (lambda: psutil.cpu_percent() / 100.0)
+        # job id -> monotonic time at which the unreported admission lapses
+        self._pending: dict[str, float] = {}
+
+    # Calls that have reported stats plus accepted jobs that have not yet
+    def active_calls(self, job_stats: list[dict]) -> int:
+        now = time.monotonic()
+        reported = {s.get("job_id") for s in job_stats}
+        for job_id, expires in list(self._pending.items()):
+            if job_id in reported or expires <= now:
+                del self._pending[job_id]
+        return len(job_stats) + len(self._pending)
+
+    # Worker load function. It must not report full while no prewarmed process is idle:
+    # LiveKit sizes its idle pool from this load, so that would stop it spawning any.
+    def load(self, worker) -> float:
+        job_stats = worker_state.read_stats(state_dir=self.state_dir)
+        active = max(len(getattr(worker, "active_jobs", [])), self.active_calls(job_stats))
+        return compute_load(active, job_stats, self.cpu_load(), self.max_calls)
+
+    # Request function: refuse calls beyond the per-worker cap so they go to another worker.
+    # The slot is taken before the first await, so concurrent requests cannot both pass the check.
+    async def admit(self, req) -> None:
+        active = self.active_calls(worker_state.read_stats(state_dir=self.state_dir))
+        if active >= self.max_calls:
+            logging.warning(f"Rejecting job, {active} calls already active (max {self.max_calls}).")
+            await req.reject()
+            return
+        self._pending[req.id] = time.monotonic() + self.grace
+        try:
+            await req.accept()
+        except Exception:
+            self._pending.pop(req.id, None)
+            raise
+
+# Admission state of this worker process
+ADMISSIONS = AdmissionControl()
+
+# WorkerOptions load_fnc and request_fnc for this worker
+def worker_load(worker) -> float:
+    return ADMISSIONS.load(worker)
+
+async def admit_job(req) -> None:
+    await ADMISSIONS.admit(req)
+
+# Periodically publishes a job process's load stats for the worker's load function
+class StatsPublisher:
+    def __init__(self, lag_monitor, queue_depth, job_id: str = "", interval: float = STATS_INTERVAL):
+        # lag_monitor is a telemetry.LoopLagMonitor; queue_depth() returns the KB inference backlog;
+        # job_id lets the worker match the stats to the admission it accepted
+        self.lag_monitor = lag_monitor
+        self.queue_depth = queue_depth
+        self.job_id = job_id
+        self.interval = interval
+        self._task = None
+
+    def start(self) -> None:
+        self.lag_monitor.start()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            worker_state.publish_stats({
+                "sessions": 1,
+                "job_id": self.job_id,
+                "kb_queue": self.queue_depth(),
+                "loop_lag": self.lag_monitor.current,
+            })
+            await asyncio.sleep(self.interval)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+        await self.lag_monitor.stop()
+        worker_state.clear_stats()
@@ -0,0 +1,133 @@
+# Import OS and temp-file helpers for the shared state directory
+import os
+import tempfile
+import atexit
+import json
+import time
+
+# ---------- Shared Worker State ----------
+#
+# The LiveKit worker process and its job processes do not share memory, so job
+# processes publish small marker files into a directory that the worker's load
+# function can read. The directory is chosen once by the worker and inherited
+# by every job process through the environment.
+
+STATE_DIR_ENV = "AGENT_STATE_DIR"
+
+# Suffix used for "this process is prewarmed and idle" markers
+READY_SUFFIX = ".ready"
+
+# Suffix used for per-job load stats, and how long they stay valid without an update
+STATS_SUFFIX = ".stats"
+STATS_MAX_AGE = 5.0
+
+# Create the state directory in the worker process before job processes are spawned
+def init_worker_state() -> str:
+    state_dir = os.getenv(STATE_DIR_ENV)
+    if not state_dir:
+        state_dir = tempfile.mkdtemp(prefix="restaurant-agent-")
+        os.environ[STATE_DIR_ENV] = state_dir
+    os.makedirs(state_dir, exist_ok=True)
+    return state_dir
+
+# Directory shared by this worker and its job processes
+def _state_dir() -> str:
+    return os.getenv(STATE_DIR_ENV) or init_worker_state()
+
+# Path of the ready marker for a given process
+def _ready_path(pid: int, state_dir: str | None = None) -> str:
+    return os.path.join(state_dir or _state_dir(), f"{pid}{READY_SUFFIX}")
+
+# Check whether a process is still running
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+# Mark the current job process as prewarmed and waiting for a job
+def mark_ready(state_dir: str | None = None) -> None:
+    path = _ready_path(os.getpid(), state_dir)
+    with open(path, "w") as f:
+        f.write("ready")
+    # Make sure the marker does not outlive the process
+    atexit.register(mark_busy, state_dir)
+
+# Mark the current job process as no longer available for new jobs
+def mark_busy(state_dir: str | None = None) -> None:
+    try:
+        os.remove(_ready_path(os.getpid(), state_dir))
+    except FileNotFoundError:
+        pass
+
+# Count prewarmed, idle job processes, cleaning up markers of dead processes
+def ready_count(state_dir: str | None = None) -> int:
+    state_dir = state_dir or _state_dir()
+    count = 0
+    try:
+        names = os.listdir(state_dir)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        if not name.endswith(READY_SUFFIX):
+            continue
+        try:
+            pid = int(name[: -len(READY_SUFFIX)])
+        except ValueError:
+            continue
+        if _pid_alive(pid):
+            count += 1
+        else:
+            try:
+                os.remove(os.path.join(state_dir, name))
+            except FileNotFoundError:
+                pass
+    return count
+
+# Path of the stats file for a given process
+def _stats_path(pid: int) -> str:
+    return os.path.join(_state_dir(), f"{pid}{STATS_SUFFIX}")
+
+# Publish load stats for the job running in the current process
+def publish_stats(stats: dict) -> None:
+    path = _stats_path(os.getpid())
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({**stats, "pid": os.getpid(), "ts": time.time()}, f)
+    # Atomic swap so the worker never reads a half-written file
+    os.replace(tmp, path)
+
+# Remove the current process's stats once its job has finished
+def clear_stats() -> None:
+    try:
+        os.remove(_stats_path(os.getpid()))
+    except FileNotFoundError:
+        pass
+
+# Stats of every job process that has reported recently
+def read_stats(max_age: float = STATS_MAX_AGE, state_dir: str | None = None) -> list[dict]:
+    state_dir = state_dir or _state_dir()
+    now = time.time()
+    stats = []
+    try:
+        names = os.listdir(state_dir)
+    except FileNotFoundError:
+        return stats
+    for name in names:
+        if not name.endswith(STATS_SUFFIX):
+            continue
+        try:
+            with open(os.path.join(state_dir, name)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if now - entry.get("ts", 0) <= max_age and _pid_alive(entry.get("pid", -1)):
+            stats.append(entry)
+    return stats
+
+# Number of job processes currently running a call
+def busy_count(state_dir: str | None = None) -> int:
+    return len(read_stats(state_dir=state_dir))